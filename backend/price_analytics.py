@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+price_analytics.py — Cross-retailer price statistics for MacTrackr catalogs.
+
+Loads products (the seed_data.py format) into flat NumPy columns, one row
+per retailer offer, and computes everything in batch:
+
+    * best in-stock price per product
+    * median and spread (max - min) of offer prices per product
+    * discount of the best in-stock price versus the Apple list price
+    * per-retailer competitiveness: how often a retailer has the lowest
+      price, and its average price relative to the product median
+
+Usage:
+    python price_analytics.py catalog.jsonl             # report for a JSONL/CSV catalog
+    python price_analytics.py --generate 500000         # report for a synthetic catalog
+    python price_analytics.py --benchmark 500000        # NumPy vs pure-Python timing
+
+Library:
+    from price_analytics import load_catalog, analyze
+    report = analyze(load_catalog(products))
+
+Requires numpy (pip install numpy).
+"""
+
+import argparse
+import json
+import math
+import statistics
+import time
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from seed_data import generate_products, iter_products
+
+LIST_PRICE_RETAILER = "Apple"
+
+
+@dataclass
+class Catalog:
+    """Offers in columnar form, grouped by product (offers of a product are contiguous)."""
+    product_ids: List[str]
+    retailers: List[str]
+    product: np.ndarray    # int64 index into product_ids, per offer
+    retailer: np.ndarray   # int32 index into retailers, per offer
+    price: np.ndarray      # float64, per offer
+    in_stock: np.ndarray   # bool, per offer
+
+    @property
+    def offers(self) -> int:
+        return len(self.price)
+
+
+@dataclass
+class PriceReport:
+    """Per-product arrays (aligned with Catalog.product_ids) and a per-retailer table.
+
+    Products without an in-stock offer have NaN best_in_stock, and products
+    without an Apple offer have NaN list_price / discount. When a product
+    has several Apple offers, the first one in catalog order is the list price.
+    """
+    best_in_stock: np.ndarray
+    median: np.ndarray
+    spread: np.ndarray
+    list_price: np.ndarray
+    discount: np.ndarray
+    retailer_ranking: List[Dict]
+
+
+def load_catalog(products: Iterable[dict], currency: str = "USD") -> Catalog:
+    """Flatten products into offer columns; offers in other currencies are skipped."""
+    product_ids: List[str] = []
+    retailer_index: Dict[str, int] = {}
+    product_col = array("q")
+    retailer_col = array("i")
+    price_col = array("d")
+    stock_col = bytearray()
+
+    for product in products:
+        offers = [r for r in product.get("retailers", ()) if r.get("currency", currency) == currency]
+        if not offers:
+            continue
+        pid = len(product_ids)
+        product_ids.append(product["id"])
+        for offer in offers:
+            rid = retailer_index.setdefault(offer["name"], len(retailer_index))
+            product_col.append(pid)
+            retailer_col.append(rid)
+            price_col.append(offer["price"])
+            stock_col.append(offer.get("availability") == "in_stock")
+
+    return Catalog(
+        product_ids=product_ids,
+        retailers=list(retailer_index),
+        product=np.frombuffer(product_col, dtype=np.int64),
+        retailer=np.frombuffer(retailer_col, dtype=np.int32),
+        price=np.frombuffer(price_col, dtype=np.float64),
+        in_stock=np.frombuffer(bytes(stock_col), dtype=np.bool_),
+    )
+
+
+def _group_min(keys: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    # keys are sorted; one reduceat over contiguous runs, NaN where a key is absent
+    out = np.full(size, np.nan)
+    if len(keys):
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        out[keys[starts]] = np.minimum.reduceat(values, starts)
+    return out
+
+
+def analyze(catalog: Catalog) -> PriceReport:
+    n_products = len(catalog.product_ids)
+    n_retailers = len(catalog.retailers)
+    product, retailer, price = catalog.product, catalog.retailer, catalog.price
+
+    # Best in-stock price: min over the in-stock subset (still grouped by product)
+    stock = catalog.in_stock
+    best_in_stock = _group_min(product[stock], price[stock], n_products)
+
+    # Min/max straight from the contiguous product groups
+    counts = np.bincount(product, minlength=n_products)
+    starts = np.cumsum(counts) - counts
+    low = np.minimum.reduceat(price, starts) if len(price) else np.zeros(0)
+    high = np.maximum.reduceat(price, starts) if len(price) else np.zeros(0)
+    spread = high - low
+
+    # Median: sort prices within each product, then index by group offsets.
+    # One argsort on an integer (product, price in cents) key is several times
+    # faster than lexsort on the two columns; sub-cent prices only tie-break.
+    cents = np.rint(price * 100).astype(np.int64)
+    cents -= cents.min() if len(cents) else 0
+    order = np.argsort(product * (int(cents.max(initial=0)) + 1) + cents, kind="stable")
+    sorted_price = price[order]
+    median = (sorted_price[starts + (counts - 1) // 2] + sorted_price[starts + counts // 2]) / 2
+
+    # Discount vs the Apple list price
+    list_price = np.full(n_products, np.nan)
+    if LIST_PRICE_RETAILER in catalog.retailers:
+        is_list = retailer == catalog.retailers.index(LIST_PRICE_RETAILER)
+        # First Apple offer per product, matching analyze_python
+        list_products, first = np.unique(product[is_list], return_index=True)
+        list_price[list_products] = price[is_list][first]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        discount = 1 - best_in_stock / list_price
+
+    # Retailer competitiveness, over all offers
+    cheapest = price <= low[product]  # ties all count as cheapest
+    offers = np.bincount(retailer, minlength=n_retailers)
+    wins = np.bincount(retailer, weights=cheapest, minlength=n_retailers)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        relative = price / median[product]
+    relative_sum = np.bincount(retailer, weights=relative, minlength=n_retailers)
+
+    ranking = [
+        {
+            "retailer": catalog.retailers[r],
+            "offers": int(offers[r]),
+            "lowest_price_share": float(wins[r] / offers[r]),
+            "avg_price_vs_median": float(relative_sum[r] / offers[r]),
+        }
+        for r in range(n_retailers)
+        if offers[r]
+    ]
+    ranking.sort(key=lambda row: (row["avg_price_vs_median"], -row["lowest_price_share"]))
+    for rank, row in enumerate(ranking, 1):
+        row["rank"] = rank
+
+    return PriceReport(best_in_stock, median, spread, list_price, discount, ranking)
+
+
+def analyze_python(products: List[dict], currency: str = "USD") -> Dict[str, Dict]:
+    """Reference implementation with plain loops; used by --benchmark to check results."""
+    per_product = {}
+    retailer_stats: Dict[str, List[float]] = {}
+    for product in products:
+        offers = [r for r in product.get("retailers", ()) if r.get("currency", currency) == currency]
+        if not offers:
+            continue
+        prices = [o["price"] for o in offers]
+        in_stock = [o["price"] for o in offers if o.get("availability") == "in_stock"]
+        best = min(in_stock) if in_stock else math.nan
+        median = statistics.median(prices)
+        low = min(prices)
+        list_price = next((o["price"] for o in offers if o["name"] == LIST_PRICE_RETAILER), math.nan)
+        per_product[product["id"]] = {
+            "best_in_stock": best,
+            "median": median,
+            "spread": max(prices) - low,
+            "discount": 1 - best / list_price if list_price == list_price and list_price else math.nan,
+        }
+        for o in offers:
+            stats = retailer_stats.setdefault(o["name"], [0, 0, 0.0])
+            stats[0] += 1
+            stats[1] += o["price"] <= low
+            stats[2] += o["price"] / median if median else math.nan
+    ranking = {
+        name: {"offers": n, "lowest_price_share": wins / n, "avg_price_vs_median": rel / n}
+        for name, (n, wins, rel) in retailer_stats.items()
+    }
+    return {"products": per_product, "retailers": ranking}
+
+
+def summarize(catalog: Catalog, report: PriceReport, top: int = 10) -> Dict:
+    has_discount = ~np.isnan(report.discount)
+    order = np.argsort(-np.where(has_discount, report.discount, -np.inf))[:top]
+    return {
+        "products": len(catalog.product_ids),
+        "offers": catalog.offers,
+        "in_stock_products": int((~np.isnan(report.best_in_stock)).sum()),
+        "median_spread": float(np.median(report.spread)) if len(report.spread) else 0.0,
+        "median_discount": float(np.nanmedian(report.discount)) if has_discount.any() else 0.0,
+        "top_discounts": [
+            {
+                "id": catalog.product_ids[i],
+                "best_in_stock": float(report.best_in_stock[i]),
+                "list_price": float(report.list_price[i]),
+                "discount": float(report.discount[i]),
+            }
+            for i in order
+            if has_discount[i]
+        ],
+        "retailer_ranking": report.retailer_ranking,
+    }
+
+
+def print_summary(summary: Dict):
+    print(f"{summary['products']} products, {summary['offers']} offers, "
+          f"{summary['in_stock_products']} with an in-stock offer")
+    print(f"Median spread ${summary['median_spread']:.2f}, "
+          f"median best-price discount vs Apple {summary['median_discount']:.1%}\n")
+    print(f"{'#':>2}  {'Retailer':<14}{'Offers':>10}{'Lowest':>9}{'vs median':>11}")
+    for row in summary["retailer_ranking"]:
+        print(f"{row['rank']:>2}  {row['retailer']:<14}{row['offers']:>10}"
+              f"{row['lowest_price_share']:>9.1%}{row['avg_price_vs_median']:>11.3f}")
+    if summary["top_discounts"]:
+        print("\nDeepest in-stock discounts:")
+        for row in summary["top_discounts"]:
+            print(f"  {row['id']:<36}${row['best_in_stock']:>9.2f} vs ${row['list_price']:>9.2f}"
+                  f"  ({row['discount']:.1%} off)")
+
+
+def benchmark(count: int, seed: int):
+    products = list(generate_products(count, seed))
+    offers = sum(len(p["retailers"]) for p in products)
+    print(f"Synthetic catalog: {count} products, {offers} offers")
+
+    start = time.perf_counter()
+    catalog = load_catalog(products)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    report = analyze(catalog)
+    numpy_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reference = analyze_python(products)
+    python_s = time.perf_counter() - start
+
+    # Results must agree before the timings mean anything
+    for field in ("best_in_stock", "median", "spread", "discount"):
+        expected = np.array([reference["products"][pid][field] for pid in catalog.product_ids])
+        if not np.allclose(getattr(report, field), expected, equal_nan=True):
+            raise AssertionError(f"{field} differs from the pure-Python reference")
+    for row in report.retailer_ranking:
+        ref = reference["retailers"][row["retailer"]]
+        if not math.isclose(row["avg_price_vs_median"], ref["avg_price_vs_median"], rel_tol=1e-9):
+            raise AssertionError(f"ranking for {row['retailer']} differs from the reference")
+
+    print(f"  columnar load   {load_s:8.3f}s")
+    print(f"  numpy analyze   {numpy_s:8.3f}s  ({offers / numpy_s / 1e6:.1f}M offers/s)")
+    print(f"  python loop     {python_s:8.3f}s  ({offers / python_s / 1e6:.1f}M offers/s)")
+    print(f"  speedup         {python_s / numpy_s:8.1f}x (analysis), "
+          f"{python_s / (load_s + numpy_s):.1f}x (including load)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-retailer price analytics")
+    parser.add_argument("input", nargs="?", help="Catalog file (.jsonl/.ndjson/.csv, '-' for stdin)")
+    parser.add_argument("--generate", type=int, metavar="N", help="Analyze N synthetic products instead")
+    parser.add_argument("--benchmark", type=int, metavar="N", help="Time NumPy vs pure Python on N synthetic products")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --generate/--benchmark")
+    parser.add_argument("--currency", default="USD", help="Only offers in this currency are compared")
+    parser.add_argument("--top", type=int, default=10, help="Deepest discounts to list")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark, args.seed)
+        return
+    if args.generate:
+        products = generate_products(args.generate, args.seed)
+    elif args.input:
+        products = iter_products(args.input)
+    else:
+        parser.error("give a catalog file, --generate or --benchmark")
+
+    catalog = load_catalog(products, currency=args.currency)
+    summary = summarize(catalog, analyze(catalog), top=args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_summary(summary)
+
+
+if __name__ == "__main__":
+    main()
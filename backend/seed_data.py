@@ -6,12 +6,40 @@ Usage:
     python seed_data.py                          # POST to Railway API
     python seed_data.py --dry-run                # Print JSON only
     python seed_data.py --api-url http://...     # Custom API URL
+
+Bulk seeding streams products from a file instead of the built-in catalog:
+
+    python seed_data.py --input catalog.jsonl --chunk-size 500 --concurrency 8
+    python seed_data.py --input catalog.csv --checkpoint catalog.ckpt
+
+Synthetic catalogs for load testing (deterministic per --seed):
+
+    python seed_data.py --generate 10000000 --seed 42 --output catalog.jsonl
+    python seed_data.py --generate 1000000 --seed 42 --api-url http://localhost:3001/api
+
+Chunks are gzip-compressed and sent over keep-alive connections (one per
+worker thread). By default the seed replaces the store, as a single POST
+always did: the first chunk goes out alone without ?mode, then the rest
+follow concurrently with ?mode=upsert. --mode upsert merges every chunk
+into the existing products instead. Failed chunks are retried with
+exponential backoff; completed chunks are recorded in the checkpoint file,
+so rerunning the same command after an interruption skips them.
 """
 
+import argparse
+import csv
+import gzip
+import http.client
 import json
+import os
+import random
 import sys
-import argparse
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+from itertools import islice
+from urllib.parse import urlsplit
 
 API_BASE = "https://price-aggregator-api-production.up.railway.app/api"
 
@@ -474,37 +502,412 @@ products = [
 ]
 
 
+
+# ---------------------------------------------------------------------------
+# Synthetic catalog generator
+# ---------------------------------------------------------------------------
+
+# (name, domain, weight): how often a retailer lists a given product
+SYNTHETIC_RETAILERS = [
+    ("Best Buy", "www.bestbuy.com", 0.75),
+    ("Amazon", "www.amazon.com", 0.8),
+    ("B&H Photo", "www.bhphotovideo.com", 0.6),
+    ("Walmart", "www.walmart.com", 0.35),
+    ("Adorama", "www.adorama.com", 0.3),
+    ("Target", "www.target.com", 0.2),
+    ("Costco", "www.costco.com", 0.15),
+    ("Micro Center", "www.microcenter.com", 0.15),
+]
+AVAILABILITY = ["in_stock", "out_of_stock", "pre_order", "unknown"]
+AVAILABILITY_WEIGHTS = [0.82, 0.11, 0.02, 0.05]
+RAM_STEPS = ["8GB", "16GB", "24GB", "32GB", "36GB", "48GB", "64GB", "96GB", "128GB", "192GB"]
+STORAGE_STEPS = ["128GB", "256GB", "512GB", "1TB", "2TB", "4TB", "8TB"]
+COLORS = ["Silver", "Space Gray", "Space Black", "Midnight", "Starlight", "Blue", "Green", "Purple"]
+# Apple-style configure-to-order upcharge per step up
+UPCHARGE_PER_STEP = 200.0
+
+
+def _step_options(steps, base):
+    # Base configuration and up to three steps above it
+    if base not in steps:
+        return [base]
+    i = steps.index(base)
+    return steps[i:i + 4]
+
+
+# Products per independently seeded RNG block: output depends only on
+# (seed, count), never on how many processes generated it
+GENERATOR_BLOCK = 10000
+# Fixed so that the same seed always yields byte-identical output
+SYNTHETIC_TIMESTAMP = "2024-06-01T00:00:00Z"
+
+_prepared_templates = None
+
+
+def _prepare_templates(templates):
+    # Precompute everything that doesn't vary per product
+    prepared = []
+    for t in templates:
+        apple = next((r for r in t["retailers"] if r["name"] == "Apple"), t["retailers"][0])
+        base = {k: v for k, v in t.items() if k not in ("id", "specs", "retailers")}
+        prepared.append((
+            t["id"], base, t["specs"], apple["price"],
+            _step_options(RAM_STEPS, t["specs"].get("ram")),
+            _step_options(STORAGE_STEPS, t["specs"].get("storage", "").replace(" SSD", "")),
+            " SSD" if t["specs"].get("storage", "").endswith(" SSD") else "",
+        ))
+    return prepared
+
+
+def _generate_block(prepared, seed, block, first, last, stamp=SYNTHETIC_TIMESTAMP):
+    rng = random.Random(f"{seed}:{block}")
+    choice, random_, choices, betavariate = rng.choice, rng.random, rng.choices, rng.betavariate
+
+    for i in range(first, last):
+        tid, base, specs, apple_price, rams, storages, ssd = choice(prepared)
+        ram_step = int(random_() ** 2 * len(rams))  # bias towards base configs
+        storage_step = int(random_() ** 2 * len(storages))
+        product_id = f"{tid}-{i:08d}"
+
+        specs = dict(specs)
+        if "ram" in specs:
+            specs["ram"] = rams[ram_step]
+        if "storage" in specs:
+            specs["storage"] = storages[storage_step] + ssd
+        specs["color"] = choice(COLORS)
+        if random_() < 0.3:
+            specs["year"] = 2022 + int(random_() * 3)
+
+        list_price = apple_price + UPCHARGE_PER_STEP * (ram_step + storage_step)
+        retailers = [{
+            "name": "Apple",
+            "url": f"https://www.apple.com/shop/product/{product_id}",
+            "price": list_price,
+            "currency": "USD",
+            "availability": choices(AVAILABILITY, AVAILABILITY_WEIGHTS)[0],
+            "lastChecked": stamp,
+        }]
+        for name, domain, weight in SYNTHETIC_RETAILERS:
+            if random_() >= weight:
+                continue
+            roll = random_()
+            if roll < 0.45:
+                price = list_price
+            elif roll < 0.95:
+                price = round(list_price * (1 - betavariate(2, 12))) - 0.01  # mostly 5-20% off
+            else:
+                price = round(list_price * (1 + random_() * 0.1)) - 0.01  # third-party markup
+            retailers.append({
+                "name": name,
+                "url": f"https://{domain}/p/{product_id}",
+                "price": price,
+                "currency": "USD",
+                "availability": choices(AVAILABILITY, AVAILABILITY_WEIGHTS)[0],
+                "lastChecked": stamp,
+            })
+
+        product = dict(base)
+        product["id"] = product_id
+        product["specs"] = specs
+        product["retailers"] = retailers
+        product["createdAt"] = product["updatedAt"] = stamp
+        yield product
+
+
+def generate_products(count, seed=0, templates=None):
+    """Yield ``count`` synthetic products derived from the built-in catalog.
+
+    Deterministic for a given (count, seed), so checkpoints from an
+    interrupted seed stay valid. Each product is a template varied in
+    RAM/storage/colour, priced from the template's Apple price plus
+    upcharges, and listed at Apple plus a weighted subset of
+    SYNTHETIC_RETAILERS. Most offers sit at list price; the rest get a
+    skewed discount, with a small share of markups.
+    """
+    prepared = _prepare_templates(templates or products)
+    for block in range(0, (count + GENERATOR_BLOCK - 1) // GENERATOR_BLOCK):
+        first = block * GENERATOR_BLOCK
+        yield from _generate_block(prepared, seed, block, first, min(first + GENERATOR_BLOCK, count))
+
+
+def _ndjson_block(job):
+    global _prepared_templates
+    if _prepared_templates is None:
+        _prepared_templates = _prepare_templates(products)
+    seed, block, first, last = job
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    return "".join(encode(p) + "\n" for p in _generate_block(_prepared_templates, seed, block, first, last))
+
+
+def write_generated_ndjson(count, seed, path, workers=None):
+    """Generate straight to NDJSON, one RNG block per job across ``workers`` processes.
+
+    Output is identical to encoding generate_products(count, seed) line by
+    line; only the wall time depends on the worker count. Blocks are written
+    in order as they finish, so memory stays at a few blocks per worker.
+    """
+    import multiprocessing
+
+    jobs = (
+        (seed, block, block * GENERATOR_BLOCK, min((block + 1) * GENERATOR_BLOCK, count))
+        for block in range((count + GENERATOR_BLOCK - 1) // GENERATOR_BLOCK)
+    )
+    out = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+    try:
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            for job in jobs:
+                out.write(_ndjson_block(job))
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                for text in pool.imap(_ndjson_block, jobs):
+                    out.write(text)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+# ---------------------------------------------------------------------------
+# Streaming bulk seeder
+# ---------------------------------------------------------------------------
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def iter_products(path):
+    """Yield products one at a time from a .jsonl/.ndjson or .csv file ("-" = stdin JSONL).
+
+    CSV rows use the Product field names as columns; ``specs`` and
+    ``retailers`` hold JSON.
+    """
+    if path == "-":
+        handle = sys.stdin
+    else:
+        handle = open(path, newline="", encoding="utf-8")
+    with handle:
+        if path.lower().endswith(".csv"):
+            for row in csv.DictReader(handle):
+                row["specs"] = json.loads(row.get("specs") or "{}")
+                row["retailers"] = json.loads(row.get("retailers") or "[]")
+                for retailer in row["retailers"]:
+                    retailer["price"] = float(retailer["price"])
+                yield row
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def iter_chunks(items, size):
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Checkpoint:
+    """Completed chunk indices for one (source, chunk size) run.
+
+    Chunks finish out of order under concurrency, so this keeps a contiguous
+    watermark plus the completed indices above it. Written atomically after
+    every chunk.
+    """
+
+    def __init__(self, path, source, chunk_size):
+        self.path = path
+        if os.path.exists(source):
+            source = os.path.abspath(source)
+        self.key = {"source": source, "chunk_size": chunk_size}
+        self.watermark = 0
+        self.done = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("key") == self.key:
+                self.watermark = saved["watermark"]
+                self.done = set(saved["done"])
+            else:
+                print(f"[WARN] Checkpoint {path} is for a different run; starting over")
+
+    def is_done(self, index):
+        return index < self.watermark or index in self.done
+
+    def mark(self, index):
+        self.done.add(index)
+        while self.watermark in self.done:
+            self.done.discard(self.watermark)
+            self.watermark += 1
+        if self.path:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"key": self.key, "watermark": self.watermark, "done": sorted(self.done)}, f)
+            os.replace(tmp, self.path)
+
+
+class SeedClient:
+    """POSTs gzip chunks to /products/seed, one keep-alive connection per thread."""
+
+    def __init__(self, api_url, retries=5, backoff=0.5, timeout=60):
+        url = urlsplit(api_url)
+        self.https = url.scheme == "https"
+        self.host = url.netloc
+        self.path = url.path.rstrip("/") + "/products/seed"
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, timeout=self.timeout)
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def send(self, chunk, replace=False):
+        """POST one chunk; ``replace`` swaps out the whole store instead of merging."""
+        body = gzip.compress(json.dumps(chunk, separators=(",", ":")).encode("utf-8"), 6)
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        path = self.path if replace else self.path + "?mode=upsert"
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                conn = self._connection()
+                conn.request("POST", path, body=body, headers=headers)
+                resp = conn.getresponse()
+                payload = resp.read()
+                if resp.status < 300:
+                    return len(body)
+                if resp.status not in RETRYABLE_STATUS:
+                    raise RuntimeError(f"HTTP {resp.status}: {payload[:200].decode(errors='replace')}")
+                error = f"HTTP {resp.status}"
+                retry_after = resp.getheader("Retry-After")
+            except (OSError, http.client.HTTPException) as e:
+                # Dropped keep-alive, timeout, refused: reconnect on the next attempt
+                self._reset()
+                error = f"{type(e).__name__}: {e}"
+            if attempt == self.retries:
+                raise RuntimeError(f"giving up after {self.retries + 1} attempts ({error})")
+            delay = self.backoff * 2 ** attempt * (1 + random.random())
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            time.sleep(delay)
+
+
+def seed_stream(items, client, chunk_size, concurrency, checkpoint, replace=True):
+    """Send ``items`` in chunks with at most ``2 * concurrency`` chunks in memory.
+
+    With ``replace`` the first chunk replaces the store and completes before
+    any other chunk is sent, so it can't wipe out chunks merged ahead of it.
+    """
+    sent = skipped = 0
+    wire_bytes = 0
+    start = time.perf_counter()
+    pending = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        def drain(block_until):
+            nonlocal sent, wire_bytes
+            done, _ = wait(pending, return_when=block_until)
+            for future in done:
+                index, count = pending.pop(future)
+                wire_bytes += future.result()  # re-raises after retries are exhausted
+                checkpoint.mark(index)
+                sent += count
+
+        for index, chunk in enumerate(iter_chunks(items, chunk_size)):
+            if checkpoint.is_done(index):
+                skipped += len(chunk)
+                continue
+            if replace and index == 0:
+                wire_bytes += client.send(chunk, replace=True)
+                checkpoint.mark(index)
+                sent += len(chunk)
+                continue
+            pending[pool.submit(client.send, chunk)] = (index, len(chunk))
+            if len(pending) >= concurrency * 2:
+                drain(FIRST_COMPLETED)
+                elapsed = time.perf_counter() - start
+                print(f"  {sent} sent, {skipped} skipped, {sent / elapsed:.0f} products/s", end="\r")
+        while pending:
+            drain(FIRST_COMPLETED)
+
+    elapsed = time.perf_counter() - start
+    print(f"\n[OK] {sent} products sent ({skipped} already done) in {elapsed:.1f}s, "
+          f"{wire_bytes / 1e6:.1f} MB on the wire")
+
+
 def main():
     parser = argparse.ArgumentParser(description="Seed the unified backend with Apple product data")
     parser.add_argument("--dry-run", action="store_true", help="Print JSON without sending to API")
     parser.add_argument("--api-url", default=API_BASE, help=f"API base URL (default: {API_BASE})")
+    parser.add_argument("--input", help="Stream products from a .jsonl/.ndjson/.csv file ('-' for stdin JSONL)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Products per request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel requests / connections")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per chunk before giving up")
+    parser.add_argument("--mode", choices=("replace", "upsert"), default="replace",
+                        help="replace: the seed becomes the whole store (default); "
+                             "upsert: merge into existing products")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <input>.checkpoint)")
+    parser.add_argument("--generate", type=int, metavar="N", help="Generate N synthetic products instead of reading --input")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for --generate")
+    parser.add_argument("--output", help="With --generate: write NDJSON here ('-' for stdout) instead of sending")
+    parser.add_argument("--workers", type=int, help="With --output: generator processes (default: CPU count)")
     args = parser.parse_args()
 
-    if args.dry_run:
+    if args.generate is not None and args.input:
+        parser.error("--generate and --input are mutually exclusive")
+
+    if args.generate is not None and args.output:
+        start = time.perf_counter()
+        written = write_generated_ndjson(args.generate, args.seed, args.output, args.workers)
+        print(f"[OK] {written} products written to {args.output} in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+        return
+
+    if args.dry_run and not args.input and args.generate is None:
         print(json.dumps(products, indent=2))
         print(f"\n[OK] {len(products)} products ready (dry run, not sent)")
         return
 
-    try:
-        import urllib.request
-
-        url = f"{args.api_url}/products/seed"
-        data = json.dumps(products).encode("utf-8")
-        req = urllib.request.Request(
-            url,
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST"
-        )
-
-        print(f"Sending {len(products)} products to {url}...")
-        with urllib.request.urlopen(req) as resp:
-            result = json.loads(resp.read().decode())
-            print(f"[OK] {result.get('message', 'Done')}")
+    if args.generate is not None:
+        source = f"generated:{args.generate}:{args.seed}"
+        items = generate_products(args.generate, args.seed)
+    else:
+        source = args.input or "builtin"
+        items = iter_products(args.input) if args.input else iter(products)
+    if args.dry_run:
+        count = sum(1 for _ in items)
+        print(f"[OK] {count} products read from {source} (dry run, not sent)")
+        return
 
+    checkpoint_path = args.checkpoint
+    if checkpoint_path is None and args.input and args.input != "-":
+        checkpoint_path = args.input + ".checkpoint"
+    if checkpoint_path is None and args.generate is not None:
+        checkpoint_path = f"generated-{args.generate}-{args.seed}.checkpoint"
+    checkpoint = Checkpoint(checkpoint_path, source, args.chunk_size)
+    client = SeedClient(args.api_url, retries=args.retries)
+
+    print(f"Seeding {source} -> {args.api_url}/products/seed "
+          f"({args.mode}, chunks of {args.chunk_size}, concurrency {args.concurrency})")
+    try:
+        seed_stream(items, client, args.chunk_size, args.concurrency, checkpoint,
+                    replace=args.mode == "replace")
     except Exception as e:
-        print(f"[ERROR] Failed to seed: {e}", file=sys.stderr)
+        print(f"\n[ERROR] Failed to seed: {e}", file=sys.stderr)
+        if checkpoint_path:
+            print(f"[ERROR] Progress saved to {checkpoint_path}; rerun to resume", file=sys.stderr)
         sys.exit(1)
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
 
 
 if __name__ == "__main__":
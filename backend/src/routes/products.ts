@@ -5,6 +5,8 @@ const router = Router();
 
 // In-memory product store (seeded from seed_data.py or loaded from unified API)
 let products: Product[] = [];
+// id -> position in products; kept in step so chunked upserts stay O(chunk)
+let productIndex = new Map<string, number>();
 
 // Helper: get lowest price across retailers
 function getLowestPrice(product: Product): number {
@@ -113,7 +115,22 @@ router.post('/seed', async (req: Request, res: Response) => {
             return res.status(400).json({ error: 'Expected an array of products' });
         }
 
+        // ?mode=upsert merges by id so a seed can arrive in chunks (and be retried)
+        if (req.query.mode === 'upsert') {
+            for (const product of incoming) {
+                const existing = productIndex.get(product.id);
+                if (existing === undefined) {
+                    productIndex.set(product.id, products.length);
+                    products.push(product);
+                } else {
+                    products[existing] = product;
+                }
+            }
+            return res.json({ message: `Upserted ${incoming.length} products`, count: products.length });
+        }
+
         products = incoming;
+        productIndex = new Map(products.map((p, i) => [p.id, i]));
         console.log(`Seeded ${products.length} products`);
 
         res.json({ message: `Seeded ${products.length} products`, count: products.length });
@@ -17,7 +17,8 @@ app.use(cors({
     origin: process.env.FRONTEND_URL || 'http://localhost:3000',
     credentials: true,
 }));
-app.use(express.json());
+// gzip/deflate bodies are inflated by express.json; the limit applies after inflating
+app.use(express.json({ limit: process.env.JSON_BODY_LIMIT || '10mb' }));
 
 import { initDatabase } from './database/schema';
 
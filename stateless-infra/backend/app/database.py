@@ -1,17 +1,147 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql+asyncpg://user:password@db:5432/stateless_db")
+# Optional replica for read-only endpoints; falls back to the primary
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+# dev | prod | bench; production deployments default to prod
+DB_PROFILE = os.getenv("DB_PROFILE", "prod" if os.getenv("APP_ENV") == "production" else "dev")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+PROFILES = {
+    "dev": {
+        "echo": True,
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_cache_size": 100,
+    },
+    "prod": {
+        "echo": False,
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_cache_size": 500,
+    },
+    # Fixed-size pool, no pre-ping round trip: numbers reflect the app, not the pool
+    "bench": {
+        "echo": False,
+        "pool_size": 50,
+        "max_overflow": 0,
+        "pool_timeout": 30,
+        "pool_recycle": -1,
+        "pool_pre_ping": False,
+        "statement_cache_size": 1000,
+    },
+}
+
+# Individual settings can be overridden on top of the profile
+ENV_OVERRIDES = {
+    "echo": ("DB_ECHO", lambda v: v.lower() in ("1", "true", "yes")),
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda v: v.lower() in ("1", "true", "yes")),
+    "statement_cache_size": ("DB_STATEMENT_CACHE_SIZE", int),
+}
+
+
+def engine_settings(profile: str = DB_PROFILE) -> dict:
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {profile!r}; expected one of {sorted(PROFILES)}")
+    settings = dict(PROFILES[profile])
+    for key, (env, cast) in ENV_OVERRIDES.items():
+        value = os.getenv(env)
+        if value is not None:
+            settings[key] = cast(value)
+    return settings
+
+
+def normalize_url(url: str) -> str:
+    # Render/compose hand out plain postgres:// DSNs; we need the async driver
+    for prefix in ("postgres://", "postgresql://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = {"checkouts": 0, "total_wait": 0.0, "max_wait": 0.0}
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            self.wait_stats["checkouts"] += 1
+            self.wait_stats["total_wait"] += waited
+            if waited > self.wait_stats["max_wait"]:
+                self.wait_stats["max_wait"] = waited
+
+    def recreate(self):
+        # Keep stats across dispose()/recreate, e.g. after a failover
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def build_engine(url: str, profile: str = DB_PROFILE):
+    settings = engine_settings(profile)
+    url = normalize_url(url)
+    options = {"echo": settings["echo"]}
+    if url.startswith("postgresql+asyncpg"):
+        # SQLite and other test stand-ins keep their own default pools
+        options.update(
+            poolclass=TimedQueuePool,
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"],
+            pool_timeout=settings["pool_timeout"],
+            pool_recycle=settings["pool_recycle"],
+            pool_pre_ping=settings["pool_pre_ping"],
+            connect_args={"statement_cache_size": settings["statement_cache_size"]},
+        )
+    return create_async_engine(url, **options)
+
+
+def pool_stats(eng) -> dict:
+    pool = eng.sync_engine.pool
+    stats = {"status": pool.status()}
+    if isinstance(pool, TimedQueuePool):
+        wait = pool.wait_stats
+        stats.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            checkouts=wait["checkouts"],
+            avg_wait=wait["total_wait"] / wait["checkouts"] if wait["checkouts"] else 0.0,
+            max_wait=wait["max_wait"],
+        )
+    return stats
+
+
+engine = build_engine(DATABASE_URL)
+read_engine = build_engine(DATABASE_READ_URL) if DATABASE_READ_URL else engine
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+AsyncReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
-async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+async def get_read_db():
+    # Read-only endpoints; served by the replica when DATABASE_READ_URL is set
+    async with AsyncReadSessionLocal() as session:
+        yield session
@@ -0,0 +1,30 @@
+import os
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the standard path is used without it
+    orjson = None
+
+# Opt-in: hot endpoints return pre-serialized orjson responses instead of
+# going through response_model validation and jsonable_encoder.
+FAST_JSON = os.getenv("FAST_JSON", "0").lower() in ("1", "true", "yes") and orjson is not None
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        # datetimes are emitted as RFC 3339 natively
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def respond(content, status_code: int = 200):
+    """Return ``content`` via orjson when FAST_JSON is on.
+
+    ``content`` must already match the route's response_model: it is sent
+    as-is, without FastAPI re-validating it. With FAST_JSON off it is
+    handed back unchanged for the normal response_model path.
+    """
+    if FAST_JSON:
+        return FastJSONResponse(content, status_code=status_code)
+    return content
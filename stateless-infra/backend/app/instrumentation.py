@@ -0,0 +1,238 @@
+"""Minimal Prometheus text-format instrumentation.
+
+Counters and histograms are plain Python numbers updated without locks.
+That is safe because every update happens on the event loop thread; don't
+record from executor threads. Label children are created once and cached,
+so the steady-state hot path is a dict lookup plus an add. Pool-style
+gauges are callbacks evaluated only at scrape time.
+"""
+from bisect import bisect_left
+from time import perf_counter
+import zlib
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Requests are counted per hash bucket of the tenant id to bound cardinality
+TENANT_BUCKETS = 32
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        if not self.labelnames:
+            self._default = self._children[()] = self._new_child()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.value += amount
+
+    def render(self):
+        lines = self._header()
+        for values, child in self._children.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {child.value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float):
+        self._default.value = value
+
+
+class GaugeCallback(_Metric):
+    """Gauge whose samples come from ``fn() -> {label_values_tuple: value}`` at scrape."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, fn, labelnames=()):
+        self.fn = fn
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return None
+
+    def render(self):
+        lines = self._header()
+        try:
+            samples = self.fn()
+        except Exception:
+            samples = {}
+        for values, value in samples.items():
+            lines.append(f"{self.name}{_labels(self.labelnames, values)} {value}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def render(self):
+        lines = self._header()
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {child.sum}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+
+def render_latest() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def tenant_bucket(app_id: str) -> str:
+    if not app_id:
+        return "none"
+    return str(zlib.crc32(app_id.encode()) % TENANT_BUCKETS)
+
+
+def size_bucket(size: int) -> str:
+    if size < 1024:
+        return "<1KiB"
+    if size < 16 * 1024:
+        return "1-16KiB"
+    if size < 256 * 1024:
+        return "16-256KiB"
+    return ">=256KiB"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ("method", "route")
+)
+REQUESTS = Counter("http_requests_total", "Requests by tenant bucket", ("tenant_bucket",))
+RATE_LIMITED = Counter("http_rate_limited_total", "429 responses by tenant bucket", ("tenant_bucket",))
+REDIS_LATENCY = Histogram("redis_command_duration_seconds", "Redis command latency", ("command",))
+ENCRYPTION_LATENCY = Histogram(
+    "encryption_duration_seconds", "Encryption service call time by payload size", ("op", "size")
+)
+ENCRYPTION_PLAINTEXT_BYTES = Counter(
+    "encryption_plaintext_bytes_total", "Plaintext bytes encrypted, by storage codec", ("codec",)
+)
+ENCRYPTION_STORED_BYTES = Counter(
+    "encryption_stored_bytes_total", "Stored envelope bytes written, by storage codec", ("codec",)
+)
+COMPRESSION_LATENCY = Histogram(
+    "encryption_compress_duration_seconds", "Compression time per payload before encryption", ("codec",)
+)
+COMPRESSION_RATIO = Histogram(
+    "encryption_compression_ratio", "Compressed / original size per compressed payload", ("codec",),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+)
+CLEANUP_ROWS = Counter("cleanup_rows_deleted_total", "Expired drafts deleted")
+CLEANUP_LAST_RUN_ROWS = Gauge("cleanup_last_run_rows_deleted", "Expired drafts deleted by the last cleanup run")
+CLEANUP_RUNS = Counter("cleanup_runs_total", "Completed cleanup runs")
+METRIC_EVENTS_DROPPED = Counter(
+    "metric_events_dropped_total", "Metric increments shed because the buffer was full and flushes were failing"
+)
+
+
+class MetricsMiddleware:
+    """Outermost ASGI layer recording latency, request and 429 counts."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = perf_counter() - start
+            route = scope.get("route")
+            # Route template, not raw path, so labels stay bounded
+            path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], path).observe(elapsed)
+            state = scope.get("state")
+            bucket = tenant_bucket(state.get("app_id") if state else None)
+            REQUESTS.labels(bucket).inc()
+            if status == 429:
+                RATE_LIMITED.labels(bucket).inc()
+
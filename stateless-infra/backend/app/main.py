@@ -1,38 +1,136 @@
-from fastapi import FastAPI, Depends, HTTPException, Header, Request
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import datetime
+import os
+import uuid
+from contextlib import asynccontextmanager
+from typing import Annotated, Literal, Optional
+
+import redis.asyncio as redis
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from contextlib import asynccontextmanager
-from typing import Annotated
 
-from .database import init_db, get_db
+from .database import get_db, get_read_db, pool_stats, engine, read_engine
+from .redis_pool import init_redis, close_redis, get_redis, get_redis_manager
+from .services import cleanup, drafts, metric_rollups
+from .services.encryption import encryption_service, init_cipher
+from .services.entitlements import entitlement_cache, load_active_receipts, run_invalidation_listener
+from .services.receipts import upsert_receipts
+from .services.metric_ingest import metric_aggregator
+from .services.bot_queue import enqueue_task
+from .services.apns import register_tokens
+from .services.idempotency import idempotency, REPLAY_HEADER
+from .services.rate_limiter import RateLimiter
+from .services.leader import LeaderLease
+from .middleware import TenantContextMiddleware
+from .instrumentation import MetricsMiddleware, GaugeCallback, render_latest
+from .startup import StartupTimer, warm_up
+from .fastjson import respond
 from . import models, schemas
 
+IMPORT_SECONDS = time.perf_counter() - _import_started
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize DB
-    await init_db()
-    
+    # Schema is managed by Alembic (`alembic upgrade head`), never at boot
+    timer = StartupTimer(import_main=IMPORT_SECONDS)
+    app.state.startup = timer
+    app.state.ready = False
+
+    # Shared Redis pool for handlers and the rate limiter
+    with timer.phase("redis_pool"):
+        redis_manager = init_redis()
+
     # Initialize global rate limiter
     global rate_limiter
-    from .services.rate_limiter import RateLimiter
-    rate_limiter = RateLimiter(requests_per_minute=100)
+    with timer.phase("rate_limiter"):
+        rate_limiter = RateLimiter(
+            requests_per_minute=int(os.getenv("RATE_LIMIT_PER_MINUTE", "100")),
+            redis_client=redis_manager.client
+        )
+        app.state.rate_limiter = rate_limiter
+
+    # Fails fast in production if ENCRYPTION_KEY is missing
+    with timer.phase("encryption_key"):
+        init_cipher()
     
-    # Start cleanup background task
-    from .services import cleanup
-    import asyncio
-    cleanup_task = asyncio.create_task(cleanup.run_cleanup_loop())
+    # Cleanup runs on one process at a time across all workers/instances
+    cleanup_leader = LeaderLease(redis_manager.client, "cleanup")
+    app.state.cleanup_leader = cleanup_leader
+    cleanup_task = asyncio.create_task(cleanup_leader.run_elected(cleanup.run_cleanup_loop))
+
+    # Periodic flush of buffered metric increments
+    metric_aggregator.start()
+    # Weekly/monthly compaction, also on a single elected process
+    rollup_task = asyncio.create_task(
+        LeaderLease(redis_manager.client, "metric-rollups").run_elected(metric_rollups.run_rollup_loop)
+    )
+
+    # Receipt writes on any worker drop this worker's cached entitlements
+    invalidation_task = asyncio.create_task(
+        run_invalidation_listener(entitlement_cache, redis_manager.client)
+    )
+
+    # Pools fill in the background; /health reports 503 until they're warm
+    warm_task = asyncio.create_task(warm_up(app, redis_manager.client, timer))
     
     yield
     # Shutdown
+    warm_task.cancel()
+    invalidation_task.cancel()
     cleanup_task.cancel()
+    rollup_task.cancel()
+    # Let the elected loops release their leases before the pool closes
+    await asyncio.gather(cleanup_task, rollup_task, invalidation_task, return_exceptions=True)
+    await metric_aggregator.stop()
     await rate_limiter.close()
+    await close_redis()
+    encryption_service.shutdown()
+
+app = FastAPI(title="Stateless Infrastructure API", lifespan=lifespan)
+
+# CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Tenant validation + rate limiting
+app.add_middleware(TenantContextMiddleware)
+
+# Request metrics; added last so it is the outermost layer and sees every response
+app.add_middleware(MetricsMiddleware)
+
+def _db_pool_samples(key: str):
+    samples = {("primary",): pool_stats(engine).get(key, 0)}
+    if read_engine is not engine:
+        samples[("replica",)] = pool_stats(read_engine).get(key, 0)
+    return samples
 
-# ... existing app init ...
+GaugeCallback("db_pool_checked_out", "SQLAlchemy connections in use", lambda: _db_pool_samples("checked_out"), ("engine",))
+GaugeCallback("db_pool_size", "SQLAlchemy pool size", lambda: _db_pool_samples("size"), ("engine",))
+GaugeCallback("db_pool_overflow", "SQLAlchemy overflow connections", lambda: _db_pool_samples("overflow"), ("engine",))
+GaugeCallback("db_pool_checkouts", "SQLAlchemy pool checkouts since start", lambda: _db_pool_samples("checkouts"), ("engine",))
+GaugeCallback("db_pool_checkout_wait_max_seconds", "Longest SQLAlchemy checkout wait", lambda: _db_pool_samples("max_wait"), ("engine",))
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(render_latest(), media_type="text/plain; version=0.0.4")
 
 @app.post("/ios/register")
 async def register_ios_token(
     token_data: dict, # { "token": "..." }
-    x_app_id: Annotated[str, Header()]
+    x_app_id: Annotated[str, Header()],
+    r: redis.Redis = Depends(get_redis)
 ):
     if not token_data or "token" not in token_data:
          raise HTTPException(status_code=400, detail="Invalid token data")
@@ -41,138 +139,247 @@ async def register_ios_token(
     if len(token) > 256: # Basic sanity check for token length
          raise HTTPException(status_code=400, detail="Token too long")
 
-    import redis.asyncio as redis
-    import os
-    r = redis.from_url(os.getenv("REDIS_URL", "redis://redis:6379/0"), socket_timeout=2.0)
-    
-    try:
-        await r.setex(f"apns:{x_app_id}:{token}", 86400, "1")
-    finally:
-        await r.close()
+    await register_tokens(r, x_app_id, [token])
     return {"status": "registered"}
 
+@app.post("/ios/register/batch")
+async def register_ios_tokens(
+    batch: schemas.IosTokenBatch,
+    x_app_id: Annotated[str, Header()],
+    r: redis.Redis = Depends(get_redis)
+):
+    added = await register_tokens(r, x_app_id, batch.tokens)
+    return {"status": "registered", "received": len(batch.tokens), "new": added}
+
 @app.get("/subscriptions")
 async def check_subscription(
     x_app_id: Annotated[str, Header()],
-    db: AsyncSession = Depends(get_db)
+    fields: Annotated[Optional[Literal["active"]], Query()] = None,
+    db: AsyncSession = Depends(get_read_db)
 ):
-    from sqlalchemy import select
-    from . import models
-    import datetime
-    
-    # Filter for active receipts only
-    now = datetime.datetime.now(datetime.timezone.utc)
-    stmt = select(models.Receipt).where(
-        models.Receipt.app_id == x_app_id,
-        models.Receipt.status == "active",
-        models.Receipt.expires_at > now
-    )
-    result = await db.execute(stmt)
-    receipts = result.scalars().all()
-    return {"active": len(receipts) > 0, "receipts": receipts}
-
-app = FastAPI(title="Stateless Infrastructure API", lifespan=lifespan)
-
-# CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    # Active receipts only, cached per tenant and coalesced on miss
+    receipts = await entitlement_cache.get(x_app_id, lambda: load_active_receipts(db, x_app_id))
+    if fields == "active":
+        return respond({"active": len(receipts) > 0})
+    return respond({"active": len(receipts) > 0, "receipts": receipts})
 
-@app.middleware("http")
-async def add_tenant_context(request: Request, call_next):
-    app_id = request.headers.get("X-App-ID")
-    # For some paths (like health check or docs) we might skip this
-    if request.url.path in ["/", "/docs", "/openapi.json", "/health"]:
-        return await call_next(request)
-        
-    if not app_id:
-        # Enforce stateless multi-tenancy
-        from fastapi.responses import JSONResponse
-        return JSONResponse(
-            status_code=400, 
-            content={"detail": "Missing X-App-ID header"}
-        )
-    
-    # Adversarial Mitigation: Length and character limits to prevent bomb/injection
-    if len(app_id) > 64 or not app_id.isalnum():
-        from fastapi.responses import JSONResponse
-        return JSONResponse(
-            status_code=400, 
-            content={"detail": "Invalid X-App-ID format"}
-        )
-        
-    request.state.app_id = app_id
-    
-    # Rate Limiting - use global instance
-    await rate_limiter.check_limit(app_id)
-
-    response = await call_next(request)
-    return response
+@app.post("/receipts/bulk", response_model=schemas.ReceiptBulkResponse)
+async def bulk_upsert_receipts(
+    batch: schemas.ReceiptBulkCreate,
+    x_app_id: Annotated[str, Header()],
+    db: AsyncSession = Depends(get_db),
+    r: redis.Redis = Depends(get_redis)
+):
+    rows = [receipt.model_dump() for receipt in batch.receipts]
+    inserted, updated = await upsert_receipts(db, x_app_id, rows)
+    await db.commit()
+    # Entitlements may have changed either way, on every worker
+    await entitlement_cache.invalidate_everywhere(r, [x_app_id])
+    return {"received": len(rows), "inserted": inserted, "updated": updated}
 
 @app.get("/health")
 async def health_check():
+    # Readiness: only route traffic here once DB and Redis pools are warm
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ok"}
+
+@app.get("/health/live")
+async def liveness_check():
     return {"status": "ok"}
 
+@app.get("/health/startup")
+async def startup_timings():
+    timer = getattr(app.state, "startup", None)
+    return {
+        "ready": getattr(app.state, "ready", False),
+        "phases": timer.phases if timer else {},
+        "pid": os.getpid(),
+        "cleanup_leader": getattr(getattr(app.state, "cleanup_leader", None), "is_leader", False),
+    }
+
+@app.get("/health/redis")
+async def redis_pool_stats():
+    return get_redis_manager().stats()
+
+@app.get("/health/db")
+async def db_pool_stats():
+    stats = {"primary": pool_stats(engine)}
+    if read_engine is not engine:
+        stats["replica"] = pool_stats(read_engine)
+    return stats
+
+@app.get("/health/encryption")
+async def encryption_stats():
+    return encryption_service.metrics()
+
+def idempotent_response(body, replayed: bool, response: Response):
+    # Replays carry a marker header so clients and logs can tell them apart
+    result = respond(body)
+    if replayed:
+        (result if isinstance(result, Response) else response).headers[REPLAY_HEADER] = "true"
+    return result
+
 @app.post("/drafts", response_model=schemas.DraftResponse)
 async def create_draft(
     draft: schemas.DraftCreate,
     x_app_id: Annotated[str, Header()],
+    response: Response,
+    idempotency_key: Annotated[Optional[str], Header()] = None,
+    db: AsyncSession = Depends(get_db),
+    r: redis.Redis = Depends(get_redis)
+):
+    async def create():
+        # Create draft logic: one INSERT ... RETURNING of just the generated columns
+        stmt = insert(models.Draft).values(
+            app_id=x_app_id,
+            content=await encryption_service.encrypt(draft.content),
+            type=draft.type
+        ).returning(models.Draft.id, models.Draft.created_at, models.Draft.expires_at)
+        row = (await db.execute(stmt)).one()
+        await db.commit()
+
+        # Return the plaintext we were given rather than decrypting our own ciphertext
+        return {
+            "id": row.id,
+            "app_id": x_app_id,
+            "content": draft.content,
+            "type": draft.type,
+            "created_at": row.created_at,
+            "expires_at": row.expires_at
+        }
+
+    body, replayed = await idempotency.run(r, x_app_id, "drafts", idempotency_key, draft, create)
+    return idempotent_response(body, replayed, response)
+
+@app.get("/drafts", response_model=schemas.DraftPage)
+async def list_drafts(
+    x_app_id: Annotated[str, Header()],
+    type: Annotated[Optional[Literal['email', 'social', 'support']], Query()] = None,
+    cursor: Annotated[Optional[str], Query(max_length=256)] = None,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    format: Annotated[Literal['json', 'ndjson'], Query()] = 'json',
+    db: AsyncSession = Depends(get_read_db)
+):
+    try:
+        after = drafts.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if format == 'ndjson':
+        # Whole result set, read through a server-side cursor and decrypted per chunk
+        return StreamingResponse(
+            drafts.stream_ndjson(x_app_id, type, after),
+            media_type="application/x-ndjson"
+        )
+
+    items, next_cursor = await drafts.fetch_page(db, x_app_id, limit, type, after)
+    return respond({"items": items, "next_cursor": next_cursor})
+
+@app.post("/drafts/batch", response_model=schemas.DraftBatchResponse)
+async def create_drafts_batch(
+    batch: schemas.DraftBatchCreate,
+    x_app_id: Annotated[str, Header()],
     db: AsyncSession = Depends(get_db)
 ):
-    # Create draft logic
-    from .services.encryption import encrypt_data
-    
-    new_draft = models.Draft(
-        app_id=x_app_id,
-        content=encrypt_data(draft.content),
-        type=draft.type
+    valid, errors = [], []
+    for index, item in enumerate(batch.items):
+        try:
+            valid.append(schemas.DraftCreate.model_validate(item))
+        except ValidationError as e:
+            errors.append(schemas.DraftBatchError(
+                index=index,
+                errors=[f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            ))
+
+    if not valid:
+        return respond({"created": [], "errors": [e.model_dump() for e in errors]})
+
+    expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    ciphertexts = await encryption_service.encrypt_many([d.content for d in valid])
+    rows = [
+        {"app_id": x_app_id, "type": d.type, "content": c, "expires_at": expires_at}
+        for d, c in zip(valid, ciphertexts)
+    ]
+
+    # One multi-row INSERT ... RETURNING; rows come back in parameter order
+    stmt = insert(models.Draft).returning(
+        models.Draft.id,
+        models.Draft.created_at,
+        models.Draft.expires_at,
+        sort_by_parameter_order=True
     )
-    db.add(new_draft)
+    result = await db.execute(stmt, rows)
+    inserted = result.all()
     await db.commit()
-    await db.refresh(new_draft)
-    
-    # Decrypt content before returning to client
-    from .services.encryption import decrypt_data
-    response_draft = schemas.DraftResponse(
-        id=new_draft.id,
-        app_id=new_draft.app_id,
-        content=decrypt_data(new_draft.content),
-        type=new_draft.type,
-        created_at=new_draft.created_at,
-        expires_at=new_draft.expires_at
-    )
-    return response_draft
+
+    # Build responses from the plaintext we already have, no refresh/decrypt
+    created = [
+        {
+            "id": row.id,
+            "app_id": x_app_id,
+            "content": d.content,
+            "type": d.type,
+            "created_at": row.created_at,
+            "expires_at": row.expires_at
+        }
+        for d, row in zip(valid, inserted)
+    ]
+    return respond({"created": created, "errors": [e.model_dump() for e in errors]})
+
+@app.post("/metrics/events", status_code=202)
+async def ingest_metric_events(
+    batch: schemas.MetricEventBatch,
+    x_app_id: Annotated[str, Header()],
+):
+    # Buffered in memory and upserted in bulk by the aggregator
+    today = datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+    for event in batch.events:
+        await metric_aggregator.add(x_app_id, event.metric_type, event.period or today, event.count)
+    return {"accepted": len(batch.events)}
+
+@app.get("/metrics/series", response_model=schemas.MetricSeries)
+async def metric_series(
+    x_app_id: Annotated[str, Header()],
+    metric_type: Literal['conversion', 'view'],
+    start: datetime.date,
+    end: Optional[datetime.date] = None,
+    granularity: Literal['auto', 'day', 'week', 'month'] = 'auto',
+    db: AsyncSession = Depends(get_read_db)
+):
+    end = end or datetime.datetime.now(datetime.timezone.utc).date()
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= metric_rollups.METRIC_SERIES_MAX_DAYS:
+        raise HTTPException(status_code=400, detail="Range too long")
+    if granularity == "auto":
+        granularity = metric_rollups.auto_granularity(start, end)
+    # Weekly/monthly buckets are served from rollup tables where they cover the range
+    return respond(await metric_rollups.query_series(db, x_app_id, metric_type, start, end, granularity))
 
 @app.post("/bots/trigger")
 async def trigger_bot(
     task: schemas.BotTaskCreate,
     x_app_id: Annotated[str, Header()],
+    response: Response,
+    idempotency_key: Annotated[Optional[str], Header()] = None,
+    r: redis.Redis = Depends(get_redis)
 ):
-    import json
-    import redis.asyncio as redis
-    import os
-    import uuid
-    
-    redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
-    r = redis.from_url(redis_url, socket_timeout=2.0)
-    
-    task_id = str(uuid.uuid4())
-    task_data = {
-        "id": task_id,
-        "type": task.type,
-        "app_id": x_app_id,
-        "payload": task.payload
-    }
-    
-    try:
-        await r.rpush("bot-tasks", json.dumps(task_data))
-    except Exception as e:
-        raise HTTPException(status_code=503, detail="Task queue unavailable")
-    finally:
-        await r.close()
-    
-    return {"status": "queued", "task_id": task_id}
+    async def enqueue():
+        task_id = str(uuid.uuid4())
+        task_data = {
+            "id": task_id,
+            "type": task.type,
+            "app_id": x_app_id,
+            "payload": task.payload
+        }
+
+        try:
+            await enqueue_task(r, task_data)
+        except redis.RedisError as e:
+            raise HTTPException(status_code=503, detail="Task queue unavailable") from e
+
+        return {"status": "queued", "task_id": task_id}
+
+    body, replayed = await idempotency.run(r, x_app_id, "bots/trigger", idempotency_key, task, enqueue)
+    return idempotent_response(body, replayed, response)
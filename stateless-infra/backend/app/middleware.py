@@ -0,0 +1,75 @@
+import json
+
+# Routes that don't need a tenant (health checks, docs)
+EXEMPT_PATHS = frozenset({"/", "/docs", "/openapi.json", "/health", "/metrics"})
+EXEMPT_PREFIXES = ("/health/",)
+
+
+def _error(status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    start = {
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    }
+    return start, {"type": "http.response.body", "body": body}
+
+
+# Prebuilt once; rejections don't allocate response objects
+MISSING_APP_ID = _error(400, "Missing X-App-ID header")
+INVALID_APP_ID = _error(400, "Invalid X-App-ID format")
+RATE_LIMITED = _error(429, "Rate limit exceeded")
+
+
+class TenantContextMiddleware:
+    """Validates X-App-ID and applies the rate limiter.
+
+    Plain ASGI rather than BaseHTTPMiddleware: no extra task or body stream
+    per request, and rejected requests are answered here without calling
+    into the rest of the stack. The limiter is read from
+    ``app.state.rate_limiter``, which lifespan sets.
+    """
+
+    def __init__(self, app, exempt_paths=EXEMPT_PATHS, exempt_prefixes=EXEMPT_PREFIXES):
+        self.app = app
+        self.exempt_paths = frozenset(exempt_paths)
+        self.exempt_prefixes = tuple(exempt_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        path = scope["path"]
+        if path in self.exempt_paths or path.startswith(self.exempt_prefixes):
+            return await self.app(scope, receive, send)
+
+        app_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-app-id":
+                app_id = value.decode("latin-1")
+                break
+
+        if not app_id:
+            # Enforce stateless multi-tenancy
+            return await _send(send, MISSING_APP_ID)
+
+        # Adversarial Mitigation: Length and character limits to prevent bomb/injection
+        if len(app_id) > 64 or not app_id.isalnum():
+            return await _send(send, INVALID_APP_ID)
+
+        # Same place request.state reads from
+        scope.setdefault("state", {})["app_id"] = app_id
+
+        if not await scope["app"].state.rate_limiter.allow(app_id):
+            return await _send(send, RATE_LIMITED)
+
+        await self.app(scope, receive, send)
+
+
+async def _send(send, response):
+    start, body = response
+    await send(start)
+    await send(body)
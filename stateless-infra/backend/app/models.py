@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import BigInteger, Column, Date, Integer, String, DateTime, Text, Index, UniqueConstraint, text
 from sqlalchemy.sql import func
 from .database import Base
 import datetime
@@ -11,8 +11,13 @@ class Draft(Base):
     type = Column(String) # 'email', 'social', 'support'
     content = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    # Auto-delete target: e.g. 24h TTL
-    expires_at = Column(DateTime(timezone=True), default=lambda: datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1))
+    # Auto-delete target: e.g. 24h TTL. Indexed for the chunked expiry scan.
+    expires_at = Column(DateTime(timezone=True), index=True, default=lambda: datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1))
+
+    __table_args__ = (
+        # Keyset pagination for GET /drafts, newest first per tenant
+        Index("ix_drafts_app_created_id", "app_id", "created_at", "id"),
+    )
 
 class Metric(Base):
     __tablename__ = "metrics"
@@ -23,6 +28,57 @@ class Metric(Base):
     count = Column(Integer, default=0)
     period = Column(String) # '2023-10-27'
 
+    __table_args__ = (
+        # Target of the bulk ON CONFLICT upsert in services/metric_ingest.py
+        UniqueConstraint("app_id", "metric_type", "period", name="uq_metrics_app_type_period"),
+        # Range scan for the rollup compaction window
+        Index("ix_metrics_period", "period"),
+    )
+
+# Compacted from daily `metrics` rows by services/metric_rollups.py
+class MetricWeekly(Base):
+    __tablename__ = "metric_rollups_weekly"
+
+    id = Column(Integer, primary_key=True)
+    app_id = Column(String, nullable=False)
+    metric_type = Column(String, nullable=False)
+    period_start = Column(Date, nullable=False) # Monday of the ISO week
+    count = Column(BigInteger, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("app_id", "metric_type", "period_start", name="uq_metric_rollups_weekly_key"),
+    )
+
+class MetricMonthly(Base):
+    __tablename__ = "metric_rollups_monthly"
+
+    id = Column(Integer, primary_key=True)
+    app_id = Column(String, nullable=False)
+    metric_type = Column(String, nullable=False)
+    period_start = Column(Date, nullable=False) # First day of the month
+    count = Column(BigInteger, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("app_id", "metric_type", "period_start", name="uq_metric_rollups_monthly_key"),
+    )
+
+# Compaction bookkeeping for the rollup tables (services/metric_rollups.py)
+class MetricRollupState(Base):
+    __tablename__ = "metric_rollup_state"
+
+    granularity = Column(String, primary_key=True) # 'week', 'month'
+    # Buckets from covered_from up to the day of the last compaction are complete
+    covered_from = Column(Date, nullable=False)
+    covered_through = Column(Date, nullable=False)
+
+class MetricRollupDirty(Base):
+    __tablename__ = "metric_rollup_dirty"
+
+    # Day that got increments after its buckets settled; '2023-10-27'
+    period = Column(String, primary_key=True)
+    # Bumped on every new increment so compaction only clears what it saw
+    version = Column(Integer, nullable=False, default=1)
+
 class Receipt(Base):
     __tablename__ = "receipts"
     id = Column(Integer, primary_key=True, index=True)
@@ -30,3 +86,16 @@ class Receipt(Base):
     transaction_id = Column(String)
     status = Column(String) # 'active', 'expired'
     expires_at = Column(DateTime(timezone=True))
+
+    __table_args__ = (
+        # Conflict target for POST /receipts/bulk
+        UniqueConstraint("app_id", "transaction_id", name="uq_receipts_app_transaction"),
+        # Entitlement lookups only ever look at active receipts
+        Index(
+            "ix_receipts_active_app_expires",
+            "app_id",
+            "expires_at",
+            postgresql_where=text("status = 'active'"),
+            sqlite_where=text("status = 'active'"),
+        ),
+    )
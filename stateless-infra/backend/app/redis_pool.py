@@ -0,0 +1,89 @@
+import redis.asyncio as redis
+import os
+import time
+
+from .instrumentation import REDIS_LATENCY
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+# Seconds a caller waits for a free connection once the pool is exhausted
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "2.0"))
+
+
+class InstrumentedRedis(redis.Redis):
+    """Redis client that records per-command latency."""
+
+    async def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            command = args[0]
+            if isinstance(command, bytes):
+                command = command.decode()
+            REDIS_LATENCY.labels(command.upper()).observe(time.perf_counter() - start)
+
+
+class RedisManager:
+    """One connection pool shared by every Redis user in the process."""
+
+    def __init__(
+        self,
+        url: str = REDIS_URL,
+        max_connections: int = REDIS_MAX_CONNECTIONS,
+        pool_timeout: float = REDIS_POOL_TIMEOUT,
+    ):
+        self.url = url
+        self.max_connections = max_connections
+        # Blocking pool: bursts wait for a connection instead of failing
+        # with "Too many connections" or opening new sockets.
+        self.pool = redis.BlockingConnectionPool.from_url(
+            url,
+            max_connections=max_connections,
+            timeout=pool_timeout,
+            decode_responses=False,
+            socket_timeout=2.0,
+            socket_connect_timeout=2.0,
+            health_check_interval=30,
+        )
+        self.client = InstrumentedRedis(connection_pool=self.pool)
+
+    def stats(self) -> dict:
+        in_use = len(getattr(self.pool, "_in_use_connections", ()))
+        idle = len(getattr(self.pool, "_available_connections", ()))
+        return {
+            "max_connections": self.max_connections,
+            "in_use": in_use,
+            "idle": idle,
+            "open": in_use + idle,
+        }
+
+    async def close(self):
+        await self.pool.disconnect()
+
+
+redis_manager: RedisManager = None
+
+
+def init_redis(**kwargs) -> RedisManager:
+    global redis_manager
+    if redis_manager is None:
+        redis_manager = RedisManager(**kwargs)
+    return redis_manager
+
+
+async def close_redis():
+    global redis_manager
+    if redis_manager is not None:
+        await redis_manager.close()
+        redis_manager = None
+
+
+def get_redis_manager() -> RedisManager:
+    if redis_manager is None:
+        raise RuntimeError("Redis pool not initialized; call init_redis() in lifespan")
+    return redis_manager
+
+
+async def get_redis() -> redis.Redis:
+    return get_redis_manager().client
@@ -0,0 +1,152 @@
+"""Re-encrypt draft content under the current ENCRYPTION_KEY.
+
+Rotation procedure:
+
+    1. Deploy with the new key in ENCRYPTION_KEY and the old one in
+       ENCRYPTION_KEYS_PREVIOUS (both decrypt, only the new one encrypts).
+    2. python -m app.rotate_keys --batch 500 --rows-per-second 2000
+    3. Once it reports done, drop the old key from ENCRYPTION_KEYS_PREVIOUS.
+
+Drafts are walked by primary key in short per-batch transactions, so no
+table lock is held and request latency is unaffected beyond the throttled
+write rate. Progress is checkpointed in Redis under the current key's
+fingerprint; an interrupted run resumes from the last committed batch, and
+rotating to yet another key starts a fresh pass.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import time
+
+import redis.asyncio as redis
+from sqlalchemy import bindparam, select
+
+from .database import AsyncSessionLocal
+from .models import Draft
+from .redis_pool import init_redis, close_redis
+from .services.encryption import encryption_service, init_cipher, key_fingerprint
+
+logger = logging.getLogger(__name__)
+
+ROTATION_BATCH = int(os.getenv("ROTATION_BATCH", "500"))
+# Upper bound on rows read per second, including rows that need no rewrite
+ROTATION_ROWS_PER_SECOND = float(os.getenv("ROTATION_ROWS_PER_SECOND", "2000"))
+CHECKPOINT_KEY = "key-rotation:drafts:{fingerprint}"
+
+# Compare-and-set on the old token so a concurrent write is never clobbered
+UPDATE_CONTENT = (
+    Draft.__table__.update()
+    .where(Draft.__table__.c.id == bindparam("b_id"), Draft.__table__.c.content == bindparam("b_old"))
+    .values(content=bindparam("b_new"))
+)
+
+
+class KeyRotationJob:
+    def __init__(
+        self,
+        r: redis.Redis,
+        batch: int = ROTATION_BATCH,
+        rows_per_second: float = ROTATION_ROWS_PER_SECOND,
+    ):
+        self.r = r
+        self.batch = batch
+        self.rows_per_second = rows_per_second
+        self.checkpoint_key = CHECKPOINT_KEY.format(fingerprint=key_fingerprint())
+        self.progress = {"last_id": 0, "scanned": 0, "rotated": 0, "skipped": 0, "done": 0}
+        self._stopping = False
+
+    def stop(self):
+        self._stopping = True
+
+    async def load_checkpoint(self):
+        saved = await self.r.hgetall(self.checkpoint_key)
+        for field, value in saved.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            if field in self.progress:
+                self.progress[field] = int(value)
+
+    async def save_checkpoint(self):
+        await self.r.hset(self.checkpoint_key, mapping=self.progress)
+
+    async def reset(self):
+        await self.r.delete(self.checkpoint_key)
+
+    async def run_batch(self) -> int:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Draft.id, Draft.content)
+                .where(Draft.id > self.progress["last_id"])
+                .order_by(Draft.id)
+                .limit(self.batch)
+            )).all()
+            if not rows:
+                return 0
+            rotated = await encryption_service.rotate_many([row.content for row in rows])
+            params = [
+                {"b_id": row.id, "b_old": row.content, "b_new": new}
+                for row, new in zip(rows, rotated)
+                if new is not None
+            ]
+            if params:
+                await db.execute(UPDATE_CONTENT, params)
+                await db.commit()
+
+        self.progress["last_id"] = rows[-1].id
+        self.progress["scanned"] += len(rows)
+        self.progress["rotated"] += len(params)
+        self.progress["skipped"] += len(rows) - len(params)
+        await self.save_checkpoint()
+        return len(rows)
+
+    async def run(self):
+        await self.load_checkpoint()
+        if self.progress["done"]:
+            logger.info(f"[Rotate] Already complete for this key: {self.progress}")
+            return
+        logger.info(f"[Rotate] Starting after id {self.progress['last_id']}")
+
+        while not self._stopping:
+            start = time.perf_counter()
+            count = await self.run_batch()
+            if count == 0:
+                self.progress["done"] = 1
+                await self.save_checkpoint()
+                logger.info(f"[Rotate] Complete: {self.progress}")
+                return
+            logger.info(
+                f"[Rotate] id<={self.progress['last_id']} scanned={self.progress['scanned']} "
+                f"rotated={self.progress['rotated']}"
+            )
+            # Throttle to the configured row rate
+            budget = count / self.rows_per_second if self.rows_per_second > 0 else 0
+            await asyncio.sleep(max(0.0, budget - (time.perf_counter() - start)))
+
+        logger.info(f"[Rotate] Stopped at id {self.progress['last_id']}; rerun to resume")
+
+
+async def main(batch: int, rows_per_second: float, reset: bool):
+    init_cipher()
+    manager = init_redis()
+    job = KeyRotationJob(manager.client, batch=batch, rows_per_second=rows_per_second)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, job.stop)
+    try:
+        if reset:
+            await job.reset()
+        await job.run()
+    finally:
+        encryption_service.shutdown()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-encrypt drafts under the current key")
+    parser.add_argument("--batch", type=int, default=ROTATION_BATCH)
+    parser.add_argument("--rows-per-second", type=float, default=ROTATION_ROWS_PER_SECOND)
+    parser.add_argument("--reset", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.batch, args.rows_per_second, args.reset))
@@ -1,6 +1,11 @@
-from pydantic import BaseModel, field_validator
-from typing import Optional, Literal
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, List, Optional, Literal
+from datetime import date, datetime
+import json
+import os
+
+# Upper bound on items accepted by POST /drafts/batch
+DRAFT_BATCH_MAX = int(os.getenv("DRAFT_BATCH_MAX", "500"))
 
 class DraftBase(BaseModel):
     content: str
@@ -18,8 +23,40 @@ class DraftResponse(DraftBase):
     class Config:
         from_attributes = True
 
+class DraftPage(BaseModel):
+    items: List[DraftResponse]
+    # Opaque keyset cursor for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+class DraftBatchCreate(BaseModel):
+    # Items are validated one by one in the handler so a bad item
+    # is reported without rejecting the rest of the batch
+    items: List[Any] = Field(..., min_length=1, max_length=DRAFT_BATCH_MAX)
+
+class DraftBatchError(BaseModel):
+    index: int
+    errors: List[str]
+
+class DraftBatchResponse(BaseModel):
+    created: List[DraftResponse]
+    errors: List[DraftBatchError]
+
+# Upper bound on device tokens accepted by POST /ios/register/batch
+IOS_TOKEN_BATCH_MAX = int(os.getenv("IOS_TOKEN_BATCH_MAX", "1000"))
+
+class IosTokenBatch(BaseModel):
+    tokens: List[str] = Field(..., min_length=1, max_length=IOS_TOKEN_BATCH_MAX)
+
+    @field_validator('tokens')
+    @classmethod
+    def validate_tokens(cls, v):
+        if any(not t or len(t) > 256 for t in v):
+            raise ValueError('tokens must be 1-256 characters')
+        return v
+
 class BotTaskCreate(BaseModel):
-    type: Literal['email', 'social']
+    # 'push' payloads are sent to every registered iOS device of the tenant
+    type: Literal['email', 'social', 'push']
     payload: dict
     
     @field_validator('payload')
@@ -28,7 +65,52 @@ class BotTaskCreate(BaseModel):
         if not isinstance(v, dict):
             raise ValueError('payload must be a dictionary')
         # Limit payload size to prevent abuse
-        import json
         if len(json.dumps(v)) > 10000:  # 10KB limit
             raise ValueError('payload too large')
         return v
+
+# Upper bound on receipts accepted by POST /receipts/bulk
+RECEIPT_BULK_MAX = int(os.getenv("RECEIPT_BULK_MAX", "50000"))
+
+class ReceiptIn(BaseModel):
+    transaction_id: str = Field(..., min_length=1, max_length=128)
+    status: Literal['active', 'expired']
+    expires_at: datetime
+
+class ReceiptBulkCreate(BaseModel):
+    receipts: List[ReceiptIn] = Field(..., min_length=1, max_length=RECEIPT_BULK_MAX)
+
+class ReceiptBulkResponse(BaseModel):
+    received: int
+    inserted: int
+    updated: int
+
+class MetricEvent(BaseModel):
+    metric_type: Literal['conversion', 'view']
+    count: int = Field(1, ge=1, le=1_000_000)
+    # Defaults to the current UTC day when omitted
+    period: Optional[str] = Field(None, pattern=r"^\d{4}-\d{2}-\d{2}$")
+
+    @field_validator('period')
+    @classmethod
+    def validate_period(cls, v):
+        # Rollups parse periods as dates, so reject e.g. 2024-13-45
+        if v is not None:
+            date.fromisoformat(v)
+        return v
+
+class MetricEventBatch(BaseModel):
+    events: List[MetricEvent] = Field(..., min_length=1, max_length=1000)
+
+class MetricPoint(BaseModel):
+    # Start of the bucket; edge buckets only count days inside the range
+    period: date
+    count: int
+
+class MetricSeries(BaseModel):
+    metric_type: str
+    granularity: Literal['day', 'week', 'month']
+    start: date
+    end: date
+    points: List[MetricPoint]
+    rows_read: dict
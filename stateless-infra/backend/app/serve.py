@@ -0,0 +1,93 @@
+"""Production launcher: N uvicorn workers behind one socket.
+
+    python -m app.serve                      # workers = CPUs this container may use
+    WEB_CONCURRENCY=4 python -m app.serve --port 10000
+
+Background loops (cleanup, rollups) are leader-elected through Redis and
+entitlement invalidations are broadcast over pub/sub, so running several
+workers neither duplicates work nor serves stale caches. On SIGTERM uvicorn
+stops accepting connections, lets in-flight requests finish for up to
+GRACEFUL_TIMEOUT seconds, then runs lifespan shutdown in each worker.
+
+Every worker opens its own database pool. DB_MAX_CONNECTIONS is the budget
+for the whole instance (per engine, so a replica gets the same again); it is
+split evenly across workers unless DB_POOL_SIZE / DB_MAX_OVERFLOW are set.
+"""
+import argparse
+import math
+import os
+
+import uvicorn
+
+# Connections one instance may hold to Postgres across all its workers;
+# the prod profile's pool_size + max_overflow for a single process
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "30"))
+
+
+def available_cpus() -> int:
+    # os.cpu_count() is the host's count inside a container; honour the
+    # affinity mask and a cgroup v2 (cpu.max) or v1 CFS quota instead
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        cpus = os.cpu_count() or 1
+    for path in ("/sys/fs/cgroup/cpu.max", "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"):
+        try:
+            with open(path) as f:
+                fields = f.read().split()
+            if path.endswith("cpu.max"):
+                quota, period = fields[0], fields[1]
+            else:
+                with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                    quota, period = fields[0], f.read().strip()
+        except (OSError, IndexError):
+            continue
+        if quota not in ("max", "-1"):
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+        break
+    return max(1, cpus)
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY") or available_cpus())
+
+
+def split_pool_budget(workers: int, budget: int = DB_MAX_CONNECTIONS):
+    # Same 2:1 pool/overflow ratio as the prod profile; every worker needs
+    # at least one connection, so more workers than budget overshoots it
+    per_worker = max(1, budget // workers)
+    pool_size = max(1, per_worker * 2 // 3)
+    return pool_size, per_worker - pool_size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with multiple workers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")))
+    args = parser.parse_args()
+
+    # Degraded-mode rate limiting splits the limit across local processes
+    os.environ.setdefault("RATE_LIMIT_INSTANCES", str(args.workers))
+    if args.workers > DB_MAX_CONNECTIONS:
+        print(f"WARNING: {args.workers} workers exceed DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS}; "
+              f"each still opens one connection")
+    # Workers inherit the environment, so each builds its share of the pool
+    pool_size, max_overflow = split_pool_budget(args.workers)
+    os.environ.setdefault("DB_POOL_SIZE", str(pool_size))
+    os.environ.setdefault("DB_MAX_OVERFLOW", str(max_overflow))
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import httpx
+import redis.asyncio as redis
+
+try:
+    import h2  # noqa: F401  (httpx[http2])
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+APNS_TOKEN_TTL = int(os.getenv("APNS_TOKEN_TTL", "86400"))
+APNS_PAGE_SIZE = int(os.getenv("APNS_PAGE_SIZE", "500"))
+# APNs production endpoint; point at bench/apns_stub.py for local testing
+APNS_ENDPOINT = os.getenv("APNS_ENDPOINT", "https://api.push.apple.com")
+APNS_AUTH_TOKEN = os.getenv("APNS_AUTH_TOKEN", "")
+APNS_CONCURRENCY = int(os.getenv("APNS_CONCURRENCY", "64"))
+APNS_MAX_CONNECTIONS = int(os.getenv("APNS_MAX_CONNECTIONS", "4"))
+APNS_TIMEOUT = float(os.getenv("APNS_TIMEOUT", "10"))
+
+
+def tokens_key(app_id: str) -> str:
+    # One sorted set per tenant: member = device token, score = expiry (unix seconds)
+    return f"apns:tokens:{app_id}"
+
+
+async def register_tokens(
+    r: redis.Redis, app_id: str, tokens: Iterable[str], ttl: int = APNS_TOKEN_TTL
+) -> int:
+    """Add or refresh device tokens; returns how many were new.
+
+    Expired members are trimmed on every write rather than by a sweeper,
+    and the set itself expires once its newest token does.
+    """
+    now = time.time()
+    mapping = {token: now + ttl for token in tokens}
+    if not mapping:
+        return 0
+    key = tokens_key(app_id)
+    async with r.pipeline(transaction=False) as pipe:
+        pipe.zremrangebyscore(key, "-inf", now)
+        pipe.zadd(key, mapping)
+        pipe.expire(key, ttl)
+        _, added, _ = await pipe.execute()
+    return added
+
+
+async def iter_token_pages(r: redis.Redis, app_id: str, page_size: int = APNS_PAGE_SIZE):
+    """Yield pages of live tokens for a tenant.
+
+    ZSCAN is incremental, so a large tenant never blocks Redis the way a
+    keyspace SCAN or a full ZRANGE would. A token re-registered mid-scan may
+    be yielded twice; expired members are skipped.
+    """
+    key = tokens_key(app_id)
+    await r.zremrangebyscore(key, "-inf", time.time())
+    cursor = 0
+    while True:
+        cursor, members = await r.zscan(key, cursor, count=page_size)
+        now = time.time()
+        page = [
+            member.decode() if isinstance(member, bytes) else member
+            for member, expires_at in members
+            if expires_at > now
+        ]
+        if page:
+            yield page
+        if cursor == 0:
+            return
+
+
+class PushDispatcher:
+    """Sends one payload to every registered device of a tenant.
+
+    Requests share one pooled HTTP/2 client (HTTP/1.1 if ``h2`` is missing),
+    so thousands of pushes multiplex over a handful of connections. Per-device
+    failures are counted, not raised; tokens APNs reports as gone (410) are
+    removed from the tenant's set.
+    """
+
+    def __init__(
+        self,
+        r: redis.Redis,
+        endpoint: str = APNS_ENDPOINT,
+        auth_token: str = APNS_AUTH_TOKEN,
+        concurrency: int = APNS_CONCURRENCY,
+        page_size: int = APNS_PAGE_SIZE,
+    ):
+        self.r = r
+        self.endpoint = endpoint
+        self.auth_token = auth_token
+        self.page_size = page_size
+        self._slots = asyncio.Semaphore(concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"authorization": f"bearer {self.auth_token}"} if self.auth_token else {}
+            self._client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                http2=HTTP2_AVAILABLE,
+                headers=headers,
+                timeout=APNS_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=APNS_MAX_CONNECTIONS,
+                    max_keepalive_connections=APNS_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def _send_one(self, token: str, payload: dict, topic: str) -> Tuple[str, int]:
+        async with self._slots:
+            try:
+                response = await self._get_client().post(
+                    f"/3/device/{token}",
+                    json=payload,
+                    headers={"apns-topic": topic, "apns-push-type": "alert"},
+                )
+                return token, response.status_code
+            except httpx.HTTPError as e:
+                logger.warning(f"[APNs] send to {token[:8]}... failed: {e}")
+                return token, 0
+
+    async def send(self, app_id: str, payload: dict, topic: Optional[str] = None) -> dict:
+        stats = {"sent": 0, "failed": 0, "unregistered": 0}
+        async for page in iter_token_pages(self.r, app_id, self.page_size):
+            results = await asyncio.gather(
+                *(self._send_one(token, payload, topic or app_id) for token in page)
+            )
+            gone: List[str] = []
+            for token, status in results:
+                if status == 200:
+                    stats["sent"] += 1
+                elif status == 410:
+                    gone.append(token)
+                else:
+                    stats["failed"] += 1
+            if gone:
+                await self.r.zrem(tokens_key(app_id), *gone)
+                stats["unregistered"] += len(gone)
+        return stats
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
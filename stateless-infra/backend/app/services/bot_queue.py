@@ -0,0 +1,29 @@
+import json
+import os
+
+import redis.asyncio as redis
+
+# Streams replaced the old `bot-tasks` list; a new key avoids WRONGTYPE
+# errors while a legacy list may still exist.
+BOT_STREAM = os.getenv("BOT_STREAM", "bot-tasks:stream")
+BOT_GROUP = os.getenv("BOT_GROUP", "bot-workers")
+BOT_DEAD_LETTER_STREAM = os.getenv("BOT_DEAD_LETTER_STREAM", "bot-tasks:dead")
+# Approximate cap on stream length so acked entries don't grow forever
+BOT_STREAM_MAXLEN = int(os.getenv("BOT_STREAM_MAXLEN", "100000"))
+
+
+async def enqueue_task(r: redis.Redis, task_data: dict) -> str:
+    return await r.xadd(
+        BOT_STREAM,
+        {"data": json.dumps(task_data)},
+        maxlen=BOT_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+async def ensure_group(r: redis.Redis):
+    try:
+        await r.xgroup_create(BOT_STREAM, BOT_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
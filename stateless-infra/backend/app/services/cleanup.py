@@ -1,32 +1,167 @@
 import asyncio
-from sqlalchemy import delete
+import os
+import time
+from sqlalchemy import delete, func, text
 from sqlalchemy.future import select
 from ..database import AsyncSessionLocal
 from ..models import Draft
+from ..instrumentation import CLEANUP_ROWS, CLEANUP_LAST_RUN_ROWS, CLEANUP_RUNS
 import datetime
 
-async def run_cleanup_loop():
+# Rows deleted per transaction; keeps each DELETE short and lock footprint small
+CLEANUP_CHUNK_SIZE = int(os.getenv("CLEANUP_CHUNK_SIZE", "1000"))
+# Bounds for the adaptive sleep between runs (seconds)
+CLEANUP_MIN_INTERVAL = float(os.getenv("CLEANUP_MIN_INTERVAL", "5"))
+CLEANUP_MAX_INTERVAL = float(os.getenv("CLEANUP_MAX_INTERVAL", "300"))
+# 'chunked' (default) or 'partition' (drop whole daily partitions, then chunk the rest)
+CLEANUP_MODE = os.getenv("CLEANUP_MODE", "chunked")
+# Daily partitions to keep created ahead of time in partition mode
+CLEANUP_PARTITIONS_AHEAD = int(os.getenv("CLEANUP_PARTITIONS_AHEAD", "3"))
+
+
+class ExpiryEngine:
+    """Deletes expired drafts in bounded chunks.
+
+    Each chunk is its own transaction selecting the oldest ``chunk_size``
+    expired ids through the ``expires_at`` index, so no run holds a long
+    lock or builds one huge transaction. After draining, the next run is
+    scheduled for the earliest upcoming expiry (clamped to the min/max
+    interval) instead of a fixed hour.
+
+    Partition mode expects ``drafts`` to be range-partitioned on
+    ``expires_at`` with one partition per UTC day named ``drafts_pYYYYMMDD``.
+    Partitions whose whole range is in the past are dropped outright and
+    the chunked delete only handles the current day. If the table is not
+    partitioned the engine logs it once and stays in chunked mode.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CLEANUP_CHUNK_SIZE,
+        min_interval: float = CLEANUP_MIN_INTERVAL,
+        max_interval: float = CLEANUP_MAX_INTERVAL,
+        mode: str = CLEANUP_MODE,
+    ):
+        self.chunk_size = chunk_size
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.mode = mode
+        self.last_run = {}
+
+    async def run_once(self) -> dict:
+        start = time.perf_counter()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        dropped = 0
+        if self.mode == "partition":
+            dropped = await self._drop_expired_partitions(now)
+
+        deleted = 0
+        chunks = 0
+        while True:
+            chunk_start = time.perf_counter()
+            async with AsyncSessionLocal() as db:
+                expired_ids = (
+                    select(Draft.id)
+                    .where(Draft.expires_at < now)
+                    .order_by(Draft.expires_at)
+                    .limit(self.chunk_size)
+                    .with_for_update(skip_locked=True)
+                )
+                result = await db.execute(delete(Draft).where(Draft.id.in_(expired_ids)))
+                await db.commit()
+            rows = result.rowcount or 0
+            if rows == 0:
+                break
+            chunks += 1
+            deleted += rows
+            print(f"[Cleanup] Chunk {chunks}: deleted {rows} rows in {time.perf_counter() - chunk_start:.3f}s")
+            if rows < self.chunk_size:
+                break
+            # Let request handlers get at the pool between chunks
+            await asyncio.sleep(0)
+
+        CLEANUP_RUNS.inc()
+        CLEANUP_ROWS.inc(deleted)
+        CLEANUP_LAST_RUN_ROWS.set(deleted)
+        self.last_run = {
+            "deleted": deleted,
+            "chunks": chunks,
+            "partitions_dropped": dropped,
+            "seconds": time.perf_counter() - start,
+        }
+        if deleted or dropped:
+            print(
+                f"[Cleanup] Deleted {deleted} expired items in {chunks} chunks, "
+                f"dropped {dropped} partitions ({self.last_run['seconds']:.3f}s)"
+            )
+        return self.last_run
+
+    async def next_delay(self) -> float:
+        async with AsyncSessionLocal() as db:
+            next_expiry = (await db.execute(select(func.min(Draft.expires_at)))).scalar()
+        if next_expiry is None:
+            return self.max_interval
+        if next_expiry.tzinfo is None:
+            next_expiry = next_expiry.replace(tzinfo=datetime.timezone.utc)
+        delay = (next_expiry - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        return min(self.max_interval, max(self.min_interval, delay))
+
+    async def _drop_expired_partitions(self, now: datetime.datetime) -> int:
+        async with AsyncSessionLocal() as db:
+            partitioned = (await db.execute(text(
+                "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = 'drafts'"
+            ))).scalar()
+            if not partitioned:
+                print("[Cleanup] drafts is not partitioned; using chunked mode")
+                self.mode = "chunked"
+                return 0
+
+            today = now.date()
+            for offset in range(CLEANUP_PARTITIONS_AHEAD + 1):
+                day = today + datetime.timedelta(days=offset)
+                await db.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS drafts_p{day:%Y%m%d} PARTITION OF drafts "
+                    f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + datetime.timedelta(days=1)).isoformat()}')"
+                ))
+
+            names = (await db.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'drafts'"
+            ))).scalars().all()
+            dropped = 0
+            for name in names:
+                # A partition for day D covers [D, D+1); drop once D+1 has passed
+                try:
+                    day = datetime.datetime.strptime(name, "drafts_p%Y%m%d").date()
+                except ValueError:
+                    continue
+                if day < today:
+                    await db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                    dropped += 1
+            await db.commit()
+        return dropped
+
+
+async def run_cleanup_loop(engine: ExpiryEngine = None):
+    engine = engine or ExpiryEngine()
     consecutive_failures = 0
     max_failures = 5
-    
+
     while True:
         try:
-            async with AsyncSessionLocal() as db:
-                print("[Cleanup] Running cleanup...")
-                now = datetime.datetime.now(datetime.timezone.utc)
-                stmt = delete(Draft).where(Draft.expires_at < now)
-                result = await db.execute(stmt)
-                await db.commit()
-                if result.rowcount > 0:
-                    print(f"[Cleanup] Deleted {result.rowcount} expired items.")
-                
-                # Reset failure counter on success
-                consecutive_failures = 0
-                
+            await engine.run_once()
+            delay = await engine.next_delay()
+
+            # Reset failure counter on success
+            consecutive_failures = 0
+
         except Exception as e:
             consecutive_failures += 1
             print(f"[Cleanup] Error (attempt {consecutive_failures}/{max_failures}): {e}")
-            
+
             if consecutive_failures >= max_failures:
                 print(f"[Cleanup] CRITICAL: Cleanup failed {max_failures} times consecutively!")
                 # In production, send alert here (e.g., to Sentry, PagerDuty)
@@ -34,6 +169,7 @@ async def run_cleanup_loop():
                 await asyncio.sleep(300)  # 5 min backoff
                 consecutive_failures = 0  # Reset to try again
                 continue
-        
-        # Run every hour
-        await asyncio.sleep(3600)
+            delay = engine.min_interval * 2 ** consecutive_failures
+
+        # Sleep until the next draft is due to expire
+        await asyncio.sleep(delay)
@@ -0,0 +1,120 @@
+import base64
+import datetime
+import json
+import os
+from typing import AsyncIterator, List, Optional, Tuple
+
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import AsyncReadSessionLocal
+from ..models import Draft
+from .encryption import encryption_service
+
+# Rows fetched from the server-side cursor and decrypted per step when streaming
+DRAFT_STREAM_CHUNK = int(os.getenv("DRAFT_STREAM_CHUNK", "500"))
+
+Cursor = Tuple[datetime.datetime, int]
+
+
+def encode_cursor(created_at: datetime.datetime, draft_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{draft_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    # Raises ValueError on anything we didn't produce
+    padded = cursor + "=" * (-len(cursor) % 4)
+    created_at, _, draft_id = base64.urlsafe_b64decode(padded.encode()).decode().partition("|")
+    return datetime.datetime.fromisoformat(created_at), int(draft_id)
+
+
+def list_query(
+    app_id: str,
+    draft_type: Optional[str] = None,
+    after: Optional[Cursor] = None,
+    dialect: str = "postgresql",
+):
+    # Newest first; keyset on (created_at, id) uses ix_drafts_app_created_id.
+    # SQLite keeps timestamps as text, and server-default rows
+    # ('2024-01-01 12:00:00') never compare equal to a bound cursor value
+    # ('2024-01-01 12:00:00.000000'), so ties on created_at would repeat
+    # across pages. There both the sort and the keyset go through julianday().
+    created_key = Draft.created_at
+    if dialect == "sqlite":
+        created_key = func.julianday(Draft.created_at)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = select(
+        Draft.id,
+        Draft.type,
+        Draft.content,
+        Draft.created_at,
+        Draft.expires_at,
+    ).where(
+        Draft.app_id == app_id,
+        Draft.expires_at > now
+    )
+    if draft_type:
+        stmt = stmt.where(Draft.type == draft_type)
+    if after:
+        created_at, draft_id = after
+        if dialect == "sqlite":
+            created_at = func.julianday(created_at)
+        stmt = stmt.where(tuple_(created_key, Draft.id) < tuple_(created_at, draft_id))
+    return stmt.order_by(created_key.desc(), Draft.id.desc())
+
+
+async def _decrypt_rows(app_id: str, rows) -> List[dict]:
+    contents = await encryption_service.decrypt_many([row.content for row in rows])
+    return [
+        {
+            "id": row.id,
+            "app_id": app_id,
+            "type": row.type,
+            "content": content,
+            "created_at": row.created_at,
+            "expires_at": row.expires_at,
+        }
+        for row, content in zip(rows, contents)
+    ]
+
+
+async def fetch_page(
+    db: AsyncSession,
+    app_id: str,
+    limit: int,
+    draft_type: Optional[str] = None,
+    after: Optional[Cursor] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    # One extra row tells us whether there is a next page
+    query = list_query(app_id, draft_type, after, db.bind.dialect.name)
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = await _decrypt_rows(app_id, rows)
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+    return items, next_cursor
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    raise TypeError(f"Unserializable {type(value).__name__}")
+
+
+async def stream_ndjson(
+    app_id: str,
+    draft_type: Optional[str] = None,
+    after: Optional[Cursor] = None,
+    chunk: int = DRAFT_STREAM_CHUNK,
+) -> AsyncIterator[bytes]:
+    # Owns its session: request-scoped dependencies are closed before a
+    # streaming body is sent.
+    async with AsyncReadSessionLocal() as db:
+        query = list_query(app_id, draft_type, after, db.bind.dialect.name)
+        result = await db.stream(query.execution_options(yield_per=chunk))
+        async for rows in result.partitions(chunk):
+            items = await _decrypt_rows(app_id, rows)
+            yield "".join(
+                json.dumps(item, default=_json_default) + "\n" for item in items
+            ).encode()
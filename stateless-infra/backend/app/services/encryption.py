@@ -1,31 +1,304 @@
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import asyncio
+import hashlib
 import os
 import sys
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+from ..instrumentation import (
+    COMPRESSION_LATENCY,
+    COMPRESSION_RATIO,
+    ENCRYPTION_LATENCY,
+    ENCRYPTION_PLAINTEXT_BYTES,
+    ENCRYPTION_STORED_BYTES,
+    size_bucket,
+)
 
 # Load key from env - MUST be set in production
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+# Retired keys, comma-separated: still accepted for decryption, never used to encrypt
+ENCRYPTION_KEYS_PREVIOUS = [k.strip() for k in os.getenv("ENCRYPTION_KEYS_PREVIOUS", "").split(",") if k.strip()]
+
+cipher_suite = None
+# Current key alone; tells rows that still need rotating from ones that don't
+primary_cipher = None
+
+def init_cipher() -> MultiFernet:
+    # Deferred from import time; lifespan calls this so a missing key still fails at boot
+    global cipher_suite, primary_cipher, ENCRYPTION_KEY
+    if cipher_suite is not None:
+        return cipher_suite
+
+    if not ENCRYPTION_KEY:
+        if os.getenv("APP_ENV") == "production":
+            print("FATAL: ENCRYPTION_KEY environment variable must be set in production!")
+            sys.exit(1)
+        else:
+            # Dev mode: generate and warn
+            print("WARNING: ENCRYPTION_KEY not set. Generating temporary key for development.")
+            print("WARNING: All encrypted data will be lost on restart!")
+            ENCRYPTION_KEY = Fernet.generate_key().decode()
+
+    primary_cipher = Fernet(ENCRYPTION_KEY.encode())
+    cipher_suite = MultiFernet([primary_cipher] + [Fernet(k.encode()) for k in ENCRYPTION_KEYS_PREVIOUS])
+    return cipher_suite
+
+def key_fingerprint() -> str:
+    # Identifies the current key in checkpoints without storing the key itself
+    init_cipher()
+    return hashlib.sha256(ENCRYPTION_KEY.encode()).hexdigest()[:12]
+
+# Stored envelope: an optional one-character codec header followed by the
+# Fernet token. Fernet tokens always start with "g" (version byte 0x80), so
+# header-less values are uncompressed, including every row written before
+# compression existed.
+CODEC_NONE = "none"
+ENVELOPE_HEADERS = {"zlib": "1", "zstd": "2"}
+HEADER_CODECS = {header: codec for codec, header in ENVELOPE_HEADERS.items()}
+
+# Payloads smaller than this are stored uncompressed
+ENCRYPTION_COMPRESS_MIN_BYTES = int(os.getenv("ENCRYPTION_COMPRESS_MIN_BYTES", "1024"))
+# zstd when installed, else zlib; "none" disables compression for new writes
+ENCRYPTION_COMPRESSION = os.getenv("ENCRYPTION_COMPRESSION", "zstd" if zstandard else "zlib")
+if ENCRYPTION_COMPRESSION == "zstd" and zstandard is None:
+    ENCRYPTION_COMPRESSION = "zlib"
+
+_zstd = threading.local()  # zstandard contexts are not thread-safe
+
+
+def _compress(codec: str, raw: bytes) -> bytes:
+    if codec == "zstd":
+        if not hasattr(_zstd, "c"):
+            _zstd.c = zstandard.ZstdCompressor(level=3)
+        return _zstd.c.compress(raw)
+    return zlib.compress(raw, 6)
 
-if not ENCRYPTION_KEY:
-    if os.getenv("APP_ENV") == "production":
-        print("FATAL: ENCRYPTION_KEY environment variable must be set in production!")
-        sys.exit(1)
-    else:
-        # Dev mode: generate and warn
-        print("WARNING: ENCRYPTION_KEY not set. Generating temporary key for development.")
-        print("WARNING: All encrypted data will be lost on restart!")
-        ENCRYPTION_KEY = Fernet.generate_key().decode()
 
-cipher_suite = Fernet(ENCRYPTION_KEY.encode())
+def _decompress(codec: str, packed: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd envelope but zstandard is not installed")
+        if not hasattr(_zstd, "d"):
+            _zstd.d = zstandard.ZstdDecompressor()
+        return _zstd.d.decompress(packed)
+    return zlib.decompress(packed)
+
+
+def seal(data: str) -> Tuple[str, str, int, int, float]:
+    """Compress (when worthwhile) then encrypt.
+
+    Returns (envelope, codec, plaintext_bytes, payload_bytes, compress_seconds),
+    where payload_bytes is what went into Fernet. Compression is skipped
+    below the size threshold and kept only if it saves space.
+    """
+    raw = data.encode()
+    codec, payload, elapsed = CODEC_NONE, raw, 0.0
+    if ENCRYPTION_COMPRESSION in ENVELOPE_HEADERS and len(raw) >= ENCRYPTION_COMPRESS_MIN_BYTES:
+        start = time.perf_counter()
+        packed = _compress(ENCRYPTION_COMPRESSION, raw)
+        elapsed = time.perf_counter() - start
+        if len(packed) < len(raw):
+            codec, payload = ENCRYPTION_COMPRESSION, packed
+    token = (cipher_suite or init_cipher()).encrypt(payload).decode()
+    header = ENVELOPE_HEADERS.get(codec, "")
+    return header + token, codec, len(raw), len(payload), elapsed
+
+
+def split_envelope(stored: str) -> Tuple[str, str]:
+    # (codec, fernet token)
+    codec = HEADER_CODECS.get(stored[:1])
+    if codec is None:
+        return CODEC_NONE, stored
+    return codec, stored[1:]
+
 
 def encrypt_data(data: str) -> str:
     if not data: return data
-    return cipher_suite.encrypt(data.encode()).decode()
+    return seal(data)[0]
 
 def decrypt_data(token: str) -> str:
     if not token: return token
     try:
-        return cipher_suite.decrypt(token.encode()).decode()
+        codec, inner = split_envelope(token)
+        payload = (cipher_suite or init_cipher()).decrypt(inner.encode())
+        if codec != CODEC_NONE:
+            payload = _decompress(codec, payload)
+        return payload.decode()
     except Exception as e:
         # Log but don't crash - data may be from old key
         print(f"Decryption error: {e}")
         return "[ENCRYPTED]"
+
+def rotate_data(token: str) -> Optional[str]:
+    """Re-encrypt ``token`` under the current key.
+
+    Returns None when nothing should be written: the token is empty, already
+    on the current key, or not readable with any configured key.
+    """
+    if not token: return None
+    suite = cipher_suite or init_cipher()
+    # The compressed payload is rotated as-is; only the Fernet layer changes
+    codec, inner = split_envelope(token)
+    try:
+        primary_cipher.decrypt(inner.encode())
+        return None
+    except InvalidToken:
+        pass
+    try:
+        return ENVELOPE_HEADERS.get(codec, "") + suite.rotate(inner.encode()).decode()
+    except InvalidToken:
+        return None
+
+
+# Payloads (summed per call) below this many bytes are handled inline; the
+# thread hop costs more than encrypting a few KB.
+ENCRYPTION_INLINE_THRESHOLD = int(os.getenv("ENCRYPTION_INLINE_THRESHOLD", "16384"))
+ENCRYPTION_WORKERS = int(os.getenv("ENCRYPTION_WORKERS", "4"))
+# Items per executor job when a large batch is split across workers
+ENCRYPTION_CHUNK_SIZE = int(os.getenv("ENCRYPTION_CHUNK_SIZE", "64"))
+
+
+class EncryptionService:
+    """Async Fernet wrapper that keeps large payloads off the event loop.
+
+    Work is run on a bounded thread pool; jobs beyond ``max_workers`` wait
+    in the executor queue, which is what ``queue_depth`` reports.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = ENCRYPTION_WORKERS,
+        inline_threshold: int = ENCRYPTION_INLINE_THRESHOLD,
+        chunk_size: int = ENCRYPTION_CHUNK_SIZE,
+    ):
+        self.max_workers = max_workers
+        self.inline_threshold = inline_threshold
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._pending = 0
+        self._stats = {
+            "inline_calls": 0,
+            "offloaded_calls": 0,
+            "items": 0,
+            "bytes": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+            "max_queue_depth": 0,
+            "plaintext_bytes": 0,
+            "stored_bytes": 0,
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="encryption"
+            )
+        return self._executor
+
+    async def encrypt_many(self, items: List[str]) -> List[str]:
+        sealed = await self._run("encrypt", _seal_chunk, items)
+        # Metrics are recorded here, on the event loop, not in worker threads
+        tokens = []
+        for item in sealed:
+            if item is None or isinstance(item, str):
+                tokens.append(item)
+                continue
+            envelope, codec, plain_bytes, payload_bytes, compress_seconds = item
+            ENCRYPTION_PLAINTEXT_BYTES.labels(codec).inc(plain_bytes)
+            ENCRYPTION_STORED_BYTES.labels(codec).inc(len(envelope))
+            if compress_seconds:
+                COMPRESSION_LATENCY.labels(ENCRYPTION_COMPRESSION).observe(compress_seconds)
+            if codec != CODEC_NONE:
+                COMPRESSION_RATIO.labels(codec).observe(payload_bytes / plain_bytes)
+            self._stats["plaintext_bytes"] += plain_bytes
+            self._stats["stored_bytes"] += len(envelope)
+            tokens.append(envelope)
+        return tokens
+
+    async def decrypt_many(self, tokens: List[str]) -> List[str]:
+        return await self._run("decrypt", _decrypt_chunk, tokens)
+
+    async def rotate_many(self, tokens: List[str]) -> List[Optional[str]]:
+        return await self._run("rotate", _rotate_chunk, tokens)
+
+    async def encrypt(self, data: str) -> str:
+        return (await self.encrypt_many([data]))[0]
+
+    async def decrypt(self, token: str) -> str:
+        return (await self.decrypt_many([token]))[0]
+
+    async def _run(self, op: str, fn, items: List[str]) -> List[str]:
+        if not items:
+            return []
+        size = sum(len(i) for i in items if i)
+        start = time.perf_counter()
+
+        if size < self.inline_threshold:
+            result = fn(items)
+            self._stats["inline_calls"] += 1
+        else:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+            self._pending += len(chunks)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._pending)
+            try:
+                parts = await asyncio.gather(
+                    *(loop.run_in_executor(executor, fn, chunk) for chunk in chunks)
+                )
+            finally:
+                self._pending -= len(chunks)
+            result = [r for part in parts for r in part]
+            self._stats["offloaded_calls"] += 1
+
+        elapsed = time.perf_counter() - start
+        ENCRYPTION_LATENCY.labels(op, size_bucket(size)).observe(elapsed)
+        self._stats["items"] += len(items)
+        self._stats["bytes"] += size
+        self._stats["total_seconds"] += elapsed
+        self._stats["max_seconds"] = max(self._stats["max_seconds"], elapsed)
+        return result
+
+    def metrics(self) -> dict:
+        calls = self._stats["inline_calls"] + self._stats["offloaded_calls"]
+        return {
+            **self._stats,
+            "queue_depth": self._pending,
+            "workers": self.max_workers,
+            "avg_seconds": self._stats["total_seconds"] / calls if calls else 0.0,
+            "compression": ENCRYPTION_COMPRESSION,
+            "stored_to_plaintext": (
+                self._stats["stored_bytes"] / self._stats["plaintext_bytes"]
+                if self._stats["plaintext_bytes"] else 0.0
+            ),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def _seal_chunk(items: List[str]) -> list:
+    # Empty values pass through unchanged, as in encrypt_data
+    return [seal(i) if i else i for i in items]
+
+
+def _decrypt_chunk(tokens: List[str]) -> List[str]:
+    return [decrypt_data(t) for t in tokens]
+
+
+def _rotate_chunk(tokens: List[str]) -> List[Optional[str]]:
+    return [rotate_data(t) for t in tokens]
+
+
+encryption_service = EncryptionService()
@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Receipt
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long an entitlement answer is reused (seconds)
+ENTITLEMENT_CACHE_TTL = float(os.getenv("ENTITLEMENT_CACHE_TTL", "30"))
+ENTITLEMENT_CACHE_MAX_TENANTS = int(os.getenv("ENTITLEMENT_CACHE_MAX_TENANTS", "10000"))
+# Invalidations are fanned out here to every worker and instance
+ENTITLEMENT_INVALIDATION_CHANNEL = "entitlements:invalidate"
+
+
+async def load_active_receipts(db: AsyncSession, app_id: str) -> List[dict]:
+    # Column projection served by the partial (app_id, expires_at) index
+    now = datetime.datetime.now(datetime.timezone.utc)
+    stmt = select(
+        Receipt.id,
+        Receipt.transaction_id,
+        Receipt.status,
+        Receipt.expires_at,
+    ).where(
+        Receipt.app_id == app_id,
+        Receipt.status == "active",
+        Receipt.expires_at > now
+    ).order_by(Receipt.expires_at)
+    result = await db.execute(stmt)
+    return [
+        {
+            "id": row.id,
+            "app_id": app_id,
+            "transaction_id": row.transaction_id,
+            "status": row.status,
+            "expires_at": row.expires_at,
+        }
+        for row in result
+    ]
+
+
+class EntitlementCache:
+    """Per-tenant cache of active receipts.
+
+    An entry lives for ``ttl`` seconds but never past the earliest
+    ``expires_at`` it contains, so a cached "active" answer cannot outlive
+    the receipt behind it. Concurrent misses for one tenant share a single
+    load. ``invalidate`` fences loads already in flight: they still answer
+    their waiters but are not cached, since they may have read the receipts
+    from before the write.
+    """
+
+    def __init__(self, ttl: float = ENTITLEMENT_CACHE_TTL, max_tenants: int = ENTITLEMENT_CACHE_MAX_TENANTS):
+        self.ttl = ttl
+        self.max_tenants = max_tenants
+        self._entries: Dict[str, Tuple[float, List[dict]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Bumped by invalidate() while a load is in flight; only those need fencing
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, app_id: str, loader: Callable[[], Awaitable[List[dict]]]) -> List[dict]:
+        entry = self._entries.get(app_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        pending = self._inflight.get(app_id)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        generation = self._generations.get(app_id, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[app_id] = future
+        try:
+            receipts = await loader()
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unobserved failure isn't logged as a leak
+            future.exception()
+            raise
+        else:
+            future.set_result(receipts)
+            if self._generations.get(app_id, 0) == generation:
+                self._store(app_id, receipts)
+            return receipts
+        finally:
+            if self._inflight.get(app_id) is future:
+                del self._inflight[app_id]
+            if app_id not in self._inflight:
+                self._generations.pop(app_id, None)
+            if not future.done():
+                # Leader was cancelled; waiters retry on their next request
+                future.cancel()
+
+    def invalidate(self, app_ids: Iterable[str]):
+        for app_id in app_ids:
+            self._entries.pop(app_id, None)
+            if app_id in self._inflight:
+                # Don't cache the running load; the next miss starts a fresh one
+                self._generations[app_id] = self._generations.get(app_id, 0) + 1
+                del self._inflight[app_id]
+
+    async def invalidate_everywhere(self, r: redis.Redis, app_ids: Iterable[str]):
+        # Local first, so this worker never serves the old answer
+        app_ids = list(app_ids)
+        self.invalidate(app_ids)
+        try:
+            await r.publish(ENTITLEMENT_INVALIDATION_CHANNEL, json.dumps(app_ids))
+        except redis.RedisError as e:
+            # Other workers fall back to expiring their entries after ttl
+            logger.warning(f"[Entitlements] Could not publish invalidation: {e}")
+
+    def clear(self):
+        self.invalidate(list(self._entries) + list(self._inflight))
+
+    def _store(self, app_id: str, receipts: List[dict]):
+        ttl = self.ttl
+        if receipts:
+            earliest = receipts[0]["expires_at"]
+            if earliest.tzinfo is None:
+                earliest = earliest.replace(tzinfo=datetime.timezone.utc)
+            remaining = (earliest - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+            ttl = min(ttl, max(0.0, remaining))
+        if len(self._entries) >= self.max_tenants:
+            # Evict the oldest insertion; dicts keep insertion order
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[app_id] = (time.monotonic() + ttl, receipts)
+
+
+async def run_invalidation_listener(cache: EntitlementCache, r: redis.Redis):
+    """Apply invalidations published by other workers to this process's cache.
+
+    Messages sent while we are unsubscribed are lost, so the cache is
+    cleared on every (re)subscribe.
+    """
+    consecutive_failures = 0
+    while True:
+        try:
+            async with r.pubsub() as pubsub:
+                await pubsub.subscribe(ENTITLEMENT_INVALIDATION_CHANNEL)
+                cache.clear()
+                consecutive_failures = 0
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        cache.invalidate(json.loads(message["data"]))
+        except redis.RedisError as e:
+            consecutive_failures += 1
+            logger.error(f"[Entitlements] Invalidation listener failed (attempt {consecutive_failures}): {e}")
+            await asyncio.sleep(min(30, 2 ** consecutive_failures))
+
+
+entitlement_cache = EntitlementCache()
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from .encryption import encryption_service
+
+logger = logging.getLogger(__name__)
+
+# How long a completed response is replayed for a repeated key (seconds)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Lifetime of the in-progress marker, so a crashed request doesn't block its key forever
+IDEMPOTENCY_LOCK_TTL = int(os.getenv("IDEMPOTENCY_LOCK_TTL", "30"))
+# How long a duplicate waits for the original before answering 409
+IDEMPOTENCY_WAIT = float(os.getenv("IDEMPOTENCY_WAIT", "10"))
+IDEMPOTENCY_KEY_MAX = 255
+REPLAY_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(payload: Any) -> str:
+    # Same key with a different body is a client bug, not a retry
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Runs a handler at most once per (tenant, route, Idempotency-Key).
+
+    The first request claims the key in Redis with a short-lived pending
+    marker, runs, and stores its response for ``ttl`` seconds. Duplicates
+    arriving meanwhile wait for that response instead of running again:
+    within one process they await the original directly, across processes
+    they poll Redis. Failed requests release the key so the client's next
+    retry runs normally. If Redis is unreachable when claiming, the handler
+    just runs; if it fails while a duplicate waits, that duplicate gets 503.
+
+    Stored responses (e.g. a created draft's plaintext) and the request
+    fingerprint are sealed with the drafts cipher, so nothing readable is
+    kept in Redis.
+    """
+
+    def __init__(
+        self,
+        ttl: int = IDEMPOTENCY_TTL,
+        lock_ttl: int = IDEMPOTENCY_LOCK_TTL,
+        wait: float = IDEMPOTENCY_WAIT,
+    ):
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.wait = wait
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.replays = 0
+
+    async def run(
+        self,
+        r: redis.Redis,
+        app_id: str,
+        route: str,
+        key: Optional[str],
+        payload: Any,
+        handler: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """Return (body, replayed). ``body`` must be JSON-encodable via jsonable_encoder."""
+        if key is None:
+            return await handler(), False
+        if not key or len(key) > IDEMPOTENCY_KEY_MAX:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+        redis_key = f"idem:{app_id}:{route}:{key}"
+        fp = fingerprint(payload)
+        deadline = time.monotonic() + self.wait
+
+        while True:
+            pending = self._inflight.get(redis_key)
+            if pending is not None:
+                # asyncio.wait neither cancels the original nor raises its errors
+                await asyncio.wait({pending}, timeout=max(0.0, deadline - time.monotonic()))
+                if not pending.done():
+                    raise self._still_running()
+                if pending.cancelled() or pending.exception() is not None:
+                    # Original failed and released the key; claim it ourselves
+                    continue
+                return self._replay(pending.result(), fp), True
+
+            try:
+                claimed = await r.set(
+                    redis_key, json.dumps({"state": "pending"}), nx=True, ex=self.lock_ttl
+                )
+            except redis.RedisError as e:
+                logger.warning(f"[Idempotency] Redis unavailable, running without dedupe: {e}")
+                return await handler(), False
+
+            if claimed:
+                return await self._lead(r, redis_key, fp, handler), False
+
+            record = await self._poll(r, redis_key, deadline)
+            if record is not None:
+                return self._replay(await self._unseal(record), fp), True
+            # Marker vanished (original failed or expired): try to claim again
+
+    async def _lead(self, r: redis.Redis, redis_key: str, fp: str, handler) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[redis_key] = future
+        try:
+            body = await handler()
+            record = {"fp": fp, "body": jsonable_encoder(body)}
+            sealed = await encryption_service.encrypt(json.dumps(record))
+            try:
+                await r.set(redis_key, json.dumps({"state": "done", "sealed": sealed}), ex=self.ttl)
+            except redis.RedisError as e:
+                # The write succeeded; only replay across processes is lost
+                logger.warning(f"[Idempotency] Could not store response: {e}")
+            future.set_result(record)
+            return body
+        except BaseException as e:
+            try:
+                await r.delete(redis_key)
+            except redis.RedisError:
+                pass  # marker expires after lock_ttl
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                # Mark retrieved so an unobserved failure isn't logged as a leak
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(redis_key, None)
+            if not future.done():
+                future.cancel()
+
+    async def _poll(self, r: redis.Redis, redis_key: str, deadline: float) -> Optional[dict]:
+        delay = 0.02
+        while True:
+            try:
+                raw = await r.get(redis_key)
+            except redis.RedisError as e:
+                # The original may still be running elsewhere; running again
+                # could duplicate it, so have the client retry later
+                logger.warning(f"[Idempotency] Redis unavailable while waiting on a duplicate: {e}")
+                raise HTTPException(status_code=503, detail="Idempotency store unavailable") from e
+            if raw is None:
+                return None
+            record = json.loads(raw)
+            if record["state"] == "done":
+                return record
+            if time.monotonic() >= deadline:
+                raise self._still_running()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    async def _unseal(self, stored: dict) -> dict:
+        return json.loads(await encryption_service.decrypt(stored["sealed"]))
+
+    def _still_running(self) -> HTTPException:
+        return HTTPException(
+            status_code=409, detail="A request with this Idempotency-Key is still in progress"
+        )
+
+    def _replay(self, record: dict, fp: str) -> Any:
+        if record["fp"] != fp:
+            raise HTTPException(
+                status_code=422, detail="Idempotency-Key was already used with a different request body"
+            )
+        self.replays += 1
+        return record["body"]
+
+
+idempotency = IdempotencyStore()
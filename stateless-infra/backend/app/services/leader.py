@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+LEADER_LEASE_TTL = float(os.getenv("LEADER_LEASE_TTL", "30"))
+# Renew well inside the TTL so one slow round trip doesn't lose the lease
+LEADER_RENEW_INTERVAL = float(os.getenv("LEADER_RENEW_INTERVAL", "10"))
+
+# Extend / release only if we still hold the lease
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    """Runs a background loop on exactly one process across all workers.
+
+    Each process tries ``SET leader:<name> <token> NX PX ttl``; the winner
+    runs the loop and renews the lease every ``renew_interval`` seconds.
+    If a renewal fails or the lease is lost, the loop is cancelled and the
+    process goes back to contending, so at most one copy runs at a time
+    (give or take one renew interval after a network partition).
+    """
+
+    def __init__(
+        self,
+        r: redis.Redis,
+        name: str,
+        ttl: float = LEADER_LEASE_TTL,
+        renew_interval: float = LEADER_RENEW_INTERVAL,
+    ):
+        self.r = r
+        self.key = f"leader:{name}"
+        self.name = name
+        self.ttl_ms = int(ttl * 1000)
+        self.renew_interval = renew_interval
+        self.token = uuid.uuid4().hex
+        self.is_leader = False
+        self._renew = r.register_script(RENEW_SCRIPT)
+        self._release = r.register_script(RELEASE_SCRIPT)
+
+    async def acquire(self) -> bool:
+        return bool(await self.r.set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    async def renew(self) -> bool:
+        return bool(await self._renew(keys=[self.key], args=[self.token, self.ttl_ms]))
+
+    async def release(self):
+        await self._release(keys=[self.key], args=[self.token])
+
+    async def run_elected(self, loop_factory: Callable[[], Awaitable[None]]):
+        while True:
+            try:
+                if not await self.acquire():
+                    await asyncio.sleep(self.renew_interval)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Leader] {self.name}: acquire failed: {e}")
+                await asyncio.sleep(self.renew_interval)
+                continue
+
+            self.is_leader = True
+            logger.info(f"[Leader] {self.name}: acquired lease, starting loop")
+            task = asyncio.create_task(loop_factory())
+            try:
+                while not task.done():
+                    await asyncio.sleep(self.renew_interval)
+                    try:
+                        renewed = await self.renew()
+                    except Exception as e:
+                        logger.error(f"[Leader] {self.name}: renew failed: {e}")
+                        renewed = False
+                    if not renewed:
+                        logger.warning(f"[Leader] {self.name}: lost lease, stopping loop")
+                        break
+            finally:
+                self.is_leader = False
+                task.cancel()
+                try:
+                    await self.release()
+                except Exception:
+                    # Lease expires on its own after the TTL
+                    pass
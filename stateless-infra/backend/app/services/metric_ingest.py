@@ -0,0 +1,148 @@
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from typing import Dict, Tuple
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from ..database import AsyncSessionLocal
+from ..instrumentation import METRIC_EVENTS_DROPPED
+from ..models import Metric
+from .metric_rollups import mark_dirty
+
+logger = logging.getLogger(__name__)
+
+METRIC_FLUSH_INTERVAL = float(os.getenv("METRIC_FLUSH_INTERVAL", "2.0"))
+# Flush early once this many distinct (tenant, type, period) keys are buffered
+METRIC_FLUSH_THRESHOLD = int(os.getenv("METRIC_FLUSH_THRESHOLD", "5000"))
+# Hard cap on buffered keys; writers wait for a flush beyond this, and new
+# keys are shed while flushes are failing
+METRIC_MAX_KEYS = int(os.getenv("METRIC_MAX_KEYS", "50000"))
+UPSERT_BATCH_ROWS = 5000
+
+MetricKey = Tuple[str, str, str]
+
+
+class MetricAggregator:
+    """Buffers metric increments in memory and upserts them in bulk.
+
+    Increments for the same (app_id, metric_type, period) are summed, then
+    written as one ``INSERT ... ON CONFLICT DO UPDATE SET count = count +
+    excluded.count`` per flush. A flush happens every ``flush_interval``
+    seconds, when ``flush_threshold`` keys are buffered, and on shutdown.
+    A failed or cancelled flush puts its increments back in the buffer.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = METRIC_FLUSH_INTERVAL,
+        flush_threshold: int = METRIC_FLUSH_THRESHOLD,
+        max_keys: int = METRIC_MAX_KEYS,
+    ):
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_keys = max_keys
+        self._buffer: Dict[MetricKey, int] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._early_flush = None
+        self._flush_failed = False
+        self.stats = {"events": 0, "flushes": 0, "rows": 0, "dropped": 0, "last_flush_seconds": 0.0}
+
+    async def add(self, app_id: str, metric_type: str, period: str, count: int = 1):
+        key = (app_id, metric_type, period)
+        if key not in self._buffer and len(self._buffer) >= self.max_keys:
+            # Backpressure instead of unbounded growth, but only while the
+            # database is taking writes: the background flushes retry it
+            if not self._flush_failed:
+                await self.flush()
+            if key not in self._buffer and len(self._buffer) >= self.max_keys:
+                self.stats["dropped"] += count
+                METRIC_EVENTS_DROPPED.inc(count)
+                return
+        self._buffer[key] = self._buffer.get(key, 0) + count
+        self.stats["events"] += 1
+        if len(self._buffer) >= self.flush_threshold and (
+            self._early_flush is None or self._early_flush.done()
+        ):
+            # One early flush at a time; keep the reference so the task isn't
+            # garbage collected mid-flush
+            self._early_flush = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self._buffer:
+                return 0
+            # Swap first so new increments land in a fresh buffer during the write
+            pending, self._buffer = self._buffer, {}
+            start = time.perf_counter()
+            try:
+                await self._upsert(pending)
+            except asyncio.CancelledError:
+                # Cancelled mid-write (shutdown): the final flush picks these up
+                self._requeue(pending)
+                raise
+            except Exception as e:
+                logger.error(f"Metric flush failed for {len(pending)} keys: {e}")
+                self._requeue(pending)
+                self._flush_failed = True
+                return 0
+            self._flush_failed = False
+            self.stats["flushes"] += 1
+            self.stats["rows"] += len(pending)
+            self.stats["last_flush_seconds"] = time.perf_counter() - start
+            return len(pending)
+
+    async def _upsert(self, pending: Dict[MetricKey, int]):
+        rows = [
+            {"app_id": app_id, "metric_type": metric_type, "period": period, "count": count}
+            for (app_id, metric_type, period), count in pending.items()
+        ]
+        async with AsyncSessionLocal() as db:
+            insert = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+            # Stay well under the 32767 bind-parameter limit per statement
+            for i in range(0, len(rows), UPSERT_BATCH_ROWS):
+                stmt = insert(Metric).values(rows[i:i + UPSERT_BATCH_ROWS])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Metric.app_id, Metric.metric_type, Metric.period],
+                    set_={"count": Metric.count + stmt.excluded["count"]},
+                )
+                await db.execute(stmt)
+            # Same transaction: a late increment is never visible without its mark
+            await mark_dirty(db, [period for (_, _, period) in pending])
+            await db.commit()
+
+    def _requeue(self, pending: Dict[MetricKey, int]):
+        for key, count in pending.items():
+            if key in self._buffer or len(self._buffer) < self.max_keys:
+                self._buffer[key] = self._buffer.get(key, 0) + count
+            else:
+                self.stats["dropped"] += count
+                METRIC_EVENTS_DROPPED.inc(count)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            # Let a cancelled flush requeue its increments before the last one
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        if self._early_flush is not None:
+            await self._early_flush
+            self._early_flush = None
+        await self.flush()
+
+
+metric_aggregator = MetricAggregator()
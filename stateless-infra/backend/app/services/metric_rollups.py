@@ -0,0 +1,290 @@
+"""Weekly/monthly rollups of the daily ``metrics`` table and range queries over them.
+
+Compaction recomputes whole buckets from daily rows (``SET count =
+excluded.count``), so reruns are idempotent. Two pieces of bookkeeping
+keep queries exact:
+
+* a watermark per granularity (``metric_rollup_state``): buckets between
+  ``covered_from`` and the last compaction are complete. The periodic loop
+  only covers its lookback window; older buckets are summed from daily rows
+  until a full backfill extends the watermark:
+
+      python -m app.services.metric_rollups --full
+
+* dirty days (``metric_rollup_dirty``): the ingest flush marks days that got
+  increments after their buckets settled. Queries read those buckets from
+  daily rows; the next compaction recomputes them, however old, and clears
+  the mark.
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import Date, and_, cast, delete, func, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import AsyncSessionLocal
+from ..models import Metric, MetricMonthly, MetricRollupDirty, MetricRollupState, MetricWeekly
+
+logger = logging.getLogger(__name__)
+
+METRIC_ROLLUP_INTERVAL = float(os.getenv("METRIC_ROLLUP_INTERVAL", "900"))
+# Days of daily history recompacted on every run (rounded down to whole buckets)
+METRIC_ROLLUP_LOOKBACK_DAYS = int(os.getenv("METRIC_ROLLUP_LOOKBACK_DAYS", "35"))
+# Buckets that ended fewer than this many days before the last compaction are
+# read from daily rows; increments for days older than this are marked dirty.
+# Larger values mean fewer dirty marks for late-but-not-very-late events.
+METRIC_ROLLUP_GRACE_DAYS = int(os.getenv("METRIC_ROLLUP_GRACE_DAYS", "1"))
+# Longest range GET /metrics/series answers
+METRIC_SERIES_MAX_DAYS = int(os.getenv("METRIC_SERIES_MAX_DAYS", "3660"))
+
+ROLLUP_MODELS = {"week": MetricWeekly, "month": MetricMonthly}
+
+
+def bucket_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return start + datetime.timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return start + datetime.timedelta(days=1)
+
+
+def utc_today() -> datetime.date:
+    return datetime.datetime.now(datetime.timezone.utc).date()
+
+
+def settled_before(day: datetime.date) -> datetime.date:
+    # Days before this may already be served from a rollup bucket
+    return day - datetime.timedelta(days=METRIC_ROLLUP_GRACE_DAYS)
+
+
+def auto_granularity(start: datetime.date, end: datetime.date) -> str:
+    days = (end - start).days + 1
+    if days > 180:
+        return "month"
+    if days > 31:
+        return "week"
+    return "day"
+
+
+def _bucket_expr(dialect: str, granularity: str):
+    # Daily periods are 'YYYY-MM-DD' strings
+    if dialect == "postgresql":
+        return cast(func.date_trunc(granularity, cast(Metric.period, Date)), Date)
+    if granularity == "week":
+        return func.date(Metric.period, "weekday 0", "-6 days")
+    return func.date(Metric.period, "start of month")
+
+
+async def compact(since: Optional[datetime.date] = None) -> Dict[str, int]:
+    """Recompute weekly and monthly buckets from daily rows on or after ``since``.
+
+    ``since`` is rounded down to the containing bucket so no bucket is
+    rebuilt from partial data. ``None`` recomputes everything. Buckets with
+    dirty days are recomputed too, whatever their age.
+    """
+    today = utc_today()
+    counts = {}
+    async with AsyncSessionLocal() as db:
+        dialect = db.bind.dialect.name
+        insert = sqlite_insert if dialect == "sqlite" else pg_insert
+        dirty = (await db.execute(select(MetricRollupDirty.period, MetricRollupDirty.version))).all()
+        for granularity, model in ROLLUP_MODELS.items():
+            lower = bucket_start(since, granularity) if since else datetime.date.min
+            # Always filter: SQLite needs a WHERE before ON CONFLICT in INSERT ... SELECT
+            ranges = [Metric.period >= (lower.isoformat() if since else "")]
+            for b in sorted({bucket_start(datetime.date.fromisoformat(p), granularity) for p, _ in dirty}):
+                if b < lower:
+                    ranges.append(and_(
+                        Metric.period >= b.isoformat(),
+                        Metric.period < next_bucket(b, granularity).isoformat(),
+                    ))
+
+            bucket = _bucket_expr(dialect, granularity).label("period_start")
+            source = select(
+                Metric.app_id, Metric.metric_type, bucket, func.sum(Metric.count)
+            ).where(or_(*ranges)).group_by(Metric.app_id, Metric.metric_type, bucket)
+            stmt = insert(model).from_select(
+                ["app_id", "metric_type", "period_start", "count"], source
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[model.app_id, model.metric_type, model.period_start],
+                set_={"count": stmt.excluded["count"]},
+            )
+            counts[granularity] = (await db.execute(stmt)).rowcount
+            await _advance_watermark(db, granularity, lower, today)
+
+        # Only the versions we read: an increment that landed meanwhile keeps its mark
+        for period, version in dirty:
+            await db.execute(delete(MetricRollupDirty).where(
+                MetricRollupDirty.period == period, MetricRollupDirty.version == version
+            ))
+        await db.commit()
+    counts["dirty_days"] = len(dirty)
+    return counts
+
+
+async def _advance_watermark(db: AsyncSession, granularity: str, lower: datetime.date, today: datetime.date):
+    state = await db.get(MetricRollupState, granularity)
+    if state is None:
+        db.add(MetricRollupState(granularity=granularity, covered_from=lower, covered_through=today))
+        return
+    if state.covered_through < lower:
+        # Compaction was down for longer than the lookback: the gap was never
+        # compacted, so coverage restarts at this run's window
+        state.covered_from = lower
+    else:
+        state.covered_from = min(state.covered_from, lower)
+    state.covered_through = today
+
+
+async def mark_dirty(db: AsyncSession, periods: List[str]):
+    """Record days whose rollup buckets may have settled without these increments.
+
+    Called by the ingest flush in its own transaction, so a day is never
+    updated without being marked.
+    """
+    cutoff = settled_before(utc_today()).isoformat()
+    late = sorted({p for p in periods if p < cutoff})
+    if not late:
+        return
+    insert = sqlite_insert if db.bind.dialect.name == "sqlite" else pg_insert
+    stmt = insert(MetricRollupDirty).values([{"period": p, "version": 1} for p in late])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MetricRollupDirty.period],
+        set_={"version": MetricRollupDirty.version + 1},
+    )
+    await db.execute(stmt)
+
+
+async def run_rollup_loop(interval: float = METRIC_ROLLUP_INTERVAL):
+    consecutive_failures = 0
+    while True:
+        since = utc_today() - datetime.timedelta(days=METRIC_ROLLUP_LOOKBACK_DAYS)
+        start = time.perf_counter()
+        try:
+            counts = await compact(since)
+            consecutive_failures = 0
+            logger.info(f"[Rollup] Compacted since {since}: {counts} in {time.perf_counter() - start:.2f}s")
+            delay = interval
+        except Exception as e:
+            consecutive_failures += 1
+            logger.error(f"[Rollup] Compaction failed (attempt {consecutive_failures}): {e}")
+            delay = min(interval, 30 * 2 ** consecutive_failures)
+        await asyncio.sleep(delay)
+
+
+async def query_series(
+    db: AsyncSession,
+    app_id: str,
+    metric_type: str,
+    start: datetime.date,
+    end: datetime.date,
+    granularity: str,
+) -> dict:
+    """Counts per bucket over [start, end], zero-filled.
+
+    Buckets wholly inside the range, within the compaction watermark, settled
+    and not dirty come from the matching rollup table. Everything else (edge
+    buckets, recent, uncovered or dirty ones) is summed from daily rows.
+    """
+    buckets: List[datetime.date] = []
+    b = bucket_start(start, granularity)
+    while b <= end:
+        buckets.append(b)
+        b = next_bucket(b, granularity)
+    totals = {b: 0 for b in buckets}
+    sources = {"rollup": 0, "daily": 0}
+    day = datetime.timedelta(days=1)
+
+    full: List[datetime.date] = []
+    model = ROLLUP_MODELS.get(granularity)
+    state = await db.get(MetricRollupState, granularity) if model is not None else None
+    if state is not None:
+        dirty = {
+            bucket_start(datetime.date.fromisoformat(period), granularity)
+            for period in await db.scalars(
+                select(MetricRollupDirty.period).where(
+                    MetricRollupDirty.period >= start.isoformat(),
+                    MetricRollupDirty.period <= end.isoformat(),
+                )
+            )
+        }
+        settled = settled_before(state.covered_through)
+        full = [
+            b for b in buckets
+            if b >= max(start, state.covered_from)
+            and next_bucket(b, granularity) <= min(end + day, settled)
+            and b not in dirty
+        ]
+    in_full = set(full)
+
+    if full:
+        result = await db.execute(
+            select(model.period_start, model.count).where(
+                model.app_id == app_id,
+                model.metric_type == metric_type,
+                model.period_start >= full[0],
+                model.period_start <= full[-1],
+            )
+        )
+        for period_start, count in result:
+            if period_start in in_full:
+                totals[period_start] += count or 0
+                sources["rollup"] += 1
+
+    # Contiguous runs of the remaining buckets, clipped to [start, end]
+    ranges: List[List[datetime.date]] = []
+    for b in buckets:
+        if b in in_full:
+            continue
+        lo, hi = max(b, start), min(next_bucket(b, granularity), end + day)
+        if ranges and ranges[-1][1] == lo:
+            ranges[-1][1] = hi
+        else:
+            ranges.append([lo, hi])
+
+    if ranges:
+        daily = select(Metric.period, Metric.count).where(
+            Metric.app_id == app_id,
+            Metric.metric_type == metric_type,
+            or_(*(
+                and_(Metric.period >= lo.isoformat(), Metric.period < hi.isoformat())
+                for lo, hi in ranges
+            )),
+        )
+        for period, count in await db.execute(daily):
+            totals[bucket_start(datetime.date.fromisoformat(period), granularity)] += count or 0
+            sources["daily"] += 1
+
+    return {
+        "metric_type": metric_type,
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "points": [{"period": b, "count": totals[b]} for b in buckets],
+        "rows_read": sources,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact daily metrics into weekly/monthly rollups")
+    parser.add_argument("--full", action="store_true", help="Recompute all history, not just the lookback window")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    since = None if args.full else utc_today() - datetime.timedelta(days=METRIC_ROLLUP_LOOKBACK_DAYS)
+    print(asyncio.run(compact(since)))
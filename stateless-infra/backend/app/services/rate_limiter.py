@@ -1,5 +1,6 @@
 import redis.asyncio as redis
 from fastapi import HTTPException
+import asyncio
 import os
 import time
 import logging
@@ -7,55 +8,221 @@ import logging
 logger = logging.getLogger(__name__)
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
 
+# How long a check may wait on Redis before we fall back to degraded mode.
+RATE_LIMIT_REDIS_TIMEOUT = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", "0.05"))
+# Number of API processes sharing one tenant limit. Only used to size the
+# local bucket in degraded mode, see RateLimiter docstring.
+RATE_LIMIT_INSTANCES = int(os.getenv("RATE_LIMIT_INSTANCES", "1"))
+
+# Token bucket refill + lease in a single atomic call. Takes up to ARGV[3]
+# tokens from the tenant bucket and returns how many were granted. The Redis
+# clock is used so API processes with skewed clocks agree on the refill.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_per_ms = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * refill_per_ms)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_per_ms) + 1000)
+return granted
+"""
+
+
+class _Lease:
+    # Tokens this process has already taken from the shared bucket.
+    __slots__ = ("tokens", "size", "expires", "denied_until", "lock")
+
+    def __init__(self):
+        self.tokens = 0
+        self.size = 1
+        self.expires = 0.0
+        self.denied_until = 0.0
+        self.lock = asyncio.Lock()
+
+
+class _LocalBucket:
+    __slots__ = ("tokens", "ts")
+
+    def __init__(self, tokens: float, ts: float):
+        self.tokens = tokens
+        self.ts = ts
+
+
 class RateLimiter:
+    """Per-tenant token bucket shared through Redis.
+
+    Normal mode: the bucket lives in Redis and is updated by one EVALSHA per
+    refill. Each process leases a batch of tokens and spends them locally, so
+    a hot tenant only reaches Redis once per batch. Lease size starts at 1 and
+    doubles while the tenant keeps draining it (up to ``max_lease``). Tokens
+    are only ever handed out by Redis, so the limit is never exceeded; unused
+    leased tokens simply expire after ``lease_ttl`` seconds, which can
+    under-admit by at most ``max_lease`` requests per process per tenant.
+
+    Degraded mode: if Redis errors or takes longer than ``redis_timeout`` the
+    limiter switches to an in-process bucket for ``degraded_retry`` seconds,
+    then probes Redis again. The local bucket gets
+    ``requests_per_minute / RATE_LIMIT_INSTANCES`` tokens per minute, so with
+    that env var set to the process count the cluster-wide rate stays within
+    the configured limit (plus one burst per process while switching over).
+    """
+
     _instance = None
     _redis_pool = None
 
-    def __new__(cls, requests_per_minute: int = 100):
+    def __new__(
+        cls,
+        requests_per_minute: int = 100,
+        max_lease: int = None,
+        lease_ttl: float = 1.0,
+        redis_timeout: float = RATE_LIMIT_REDIS_TIMEOUT,
+        degraded_retry: float = 5.0,
+        max_tenants: int = 10000,
+        redis_client: redis.Redis = None,
+    ):
         if cls._instance is None:
             # Simple lock-free singleton is fine if initialized during lifespan startup as we did
             cls._instance = super().__new__(cls)
-            cls._instance.requests_per_minute = requests_per_minute
+            self = cls._instance
+            self.requests_per_minute = requests_per_minute
+            self.max_lease = max_lease or max(1, requests_per_minute // 20)
+            self.lease_ttl = lease_ttl
+            self.redis_timeout = redis_timeout
+            self.degraded_retry = degraded_retry
+            self.max_tenants = max_tenants
+            self._refill_per_ms = requests_per_minute / 60000.0
+            self._local_capacity = max(1.0, requests_per_minute / max(1, RATE_LIMIT_INSTANCES))
+            self._leases = {}
+            self._local = {}
+            self._degraded_until = 0.0
+            self._script = None
             try:
-                cls._instance._redis_pool = redis.ConnectionPool.from_url(
-                    REDIS_URL,
-                    max_connections=50,
-                    decode_responses=False,
-                    socket_timeout=2.0,
-                    socket_connect_timeout=2.0
-                )
+                if redis_client is None:
+                    # Standalone use; inside the app the shared pool is passed in
+                    self._redis_pool = redis.ConnectionPool.from_url(
+                        REDIS_URL,
+                        max_connections=50,
+                        decode_responses=False,
+                        socket_timeout=2.0,
+                        socket_connect_timeout=2.0
+                    )
+                    redis_client = redis.Redis(connection_pool=self._redis_pool)
+                self._script = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
             except Exception as e:
-                logger.error(f"Failed to initialize Redis pool for RateLimiter: {e}")
-                cls._instance._redis_pool = None
+                logger.error(f"Failed to initialize Redis pool for RateLimiter, running degraded: {e}")
+                self._redis_pool = None
         return cls._instance
 
-    async def check_limit(self, key: str):
-        if not key or not self._redis_pool:
-            # Fail-open: if Redis down or no key, allow but log
+    @property
+    def degraded(self) -> bool:
+        return self._script is None or self._degraded_until > time.monotonic()
+
+    async def allow(self, key: str) -> bool:
+        if not key:
             return True
-            
-        current_minute = int(time.time() // 60)
-        redis_key = f"rate_limit:{key}:{current_minute}"
-        
-        try:
-            r = redis.Redis(connection_pool=self._redis_pool)
-            async with r.pipeline(transaction=True) as pipe:
-                await pipe.incr(redis_key)
-                await pipe.expire(redis_key, 65)
-                result = await pipe.execute()
-                
-            request_count = result[0]
-            if request_count > self.requests_per_minute:
-                raise HTTPException(status_code=429, detail="Rate limit exceeded")
-        except HTTPException:
-            raise
-        except Exception as e:
-            # Fail-open if Redis fails during check
-            logger.error(f"RateLimiter Redis failure for key {key}: {e}")
+
+        now = time.monotonic()
+        lease = self._leases.get(key)
+        if lease is not None:
+            if lease.tokens > 0 and lease.expires > now:
+                lease.tokens -= 1
+                return True
+            if lease.denied_until > now:
+                return False
+
+        if self._script is None or self._degraded_until > now:
+            return self._allow_local(key, now)
+
+        if lease is None:
+            if len(self._leases) >= self.max_tenants:
+                self._prune(now)
+            lease = self._leases[key] = _Lease()
+
+        async with lease.lock:
+            # Another request may have refilled the lease while we waited
+            now = time.monotonic()
+            if lease.tokens <= 0 or lease.expires <= now:
+                # Grow the batch while the tenant keeps draining it before expiry
+                if lease.expires > now:
+                    lease.size = min(self.max_lease, lease.size * 2)
+                else:
+                    lease.size = 1
+                try:
+                    granted = await asyncio.wait_for(
+                        self._script(
+                            keys=[f"rate_limit:{key}"],
+                            args=[self.requests_per_minute, self._refill_per_ms, lease.size],
+                        ),
+                        self.redis_timeout,
+                    )
+                except Exception as e:
+                    self._enter_degraded(key, e)
+                    return self._allow_local(key, now)
+
+                if self._degraded_until:
+                    logger.info("RateLimiter Redis recovered, leaving degraded mode")
+                    self._degraded_until = 0.0
+                    self._local.clear()
+
+                lease.tokens = int(granted)
+                lease.expires = now + self.lease_ttl
+                if lease.tokens == 0:
+                    # Don't ask Redis again before the next token can exist
+                    lease.denied_until = now + 1.0 / (self._refill_per_ms * 1000)
+                    return False
+
+            lease.tokens -= 1
             return True
-        
+
+    async def check_limit(self, key: str):
+        if not await self.allow(key):
+            raise HTTPException(status_code=429, detail="Rate limit exceeded")
         return True
 
+    def _allow_local(self, key: str, now: float) -> bool:
+        bucket = self._local.get(key)
+        if bucket is None:
+            if len(self._local) >= self.max_tenants:
+                self._local.clear()
+            bucket = self._local[key] = _LocalBucket(self._local_capacity, now)
+        rate = self._local_capacity / 60.0
+        bucket.tokens = min(self._local_capacity, bucket.tokens + (now - bucket.ts) * rate)
+        bucket.ts = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True
+        return False
+
+    def _enter_degraded(self, key: str, error: Exception):
+        if not self._degraded_until:
+            logger.error(f"RateLimiter Redis failure for key {key}, entering degraded mode: {error!r}")
+        self._degraded_until = time.monotonic() + self.degraded_retry
+
+    def _prune(self, now: float):
+        stale = [
+            k for k, lease in self._leases.items()
+            if lease.expires <= now and lease.denied_until <= now and not lease.lock.locked()
+        ]
+        for k in stale:
+            del self._leases[k]
+
     async def close(self):
+        # Only disconnect a pool we created; the shared one belongs to lifespan
         if self._redis_pool:
             await self._redis_pool.disconnect()
+        RateLimiter._instance = None
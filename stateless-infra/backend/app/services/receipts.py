@@ -0,0 +1,99 @@
+import os
+from typing import List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Receipt
+
+# Imports larger than this go through COPY into a staging table (Postgres only)
+RECEIPT_COPY_THRESHOLD = int(os.getenv("RECEIPT_COPY_THRESHOLD", "5000"))
+# Rows per multi-row INSERT, well under the 32767 bind-parameter limit
+UPSERT_BATCH_ROWS = 5000
+
+CREATE_STAGING = text(
+    "CREATE TEMP TABLE IF NOT EXISTS receipts_staging "
+    "(app_id text, transaction_id text, status text, expires_at timestamptz) ON COMMIT DROP"
+)
+MERGE_FROM_STAGING = text("""
+    INSERT INTO receipts (app_id, transaction_id, status, expires_at)
+    SELECT app_id, transaction_id, status, expires_at FROM receipts_staging
+    ON CONFLICT (app_id, transaction_id) DO UPDATE
+    SET status = excluded.status, expires_at = excluded.expires_at
+    RETURNING (xmax = 0) AS inserted
+""")
+
+
+def dedupe(rows: List[dict]) -> List[dict]:
+    # One statement can't touch the same conflict key twice; last one wins
+    return list({row["transaction_id"]: row for row in rows}.values())
+
+
+async def upsert_receipts(db: AsyncSession, app_id: str, rows: List[dict]) -> Tuple[int, int]:
+    """Insert or update receipts by (app_id, transaction_id).
+
+    Returns (inserted, updated). Caller commits.
+    """
+    rows = [dict(row, app_id=app_id) for row in dedupe(rows)]
+    if not rows:
+        return 0, 0
+
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql" and len(rows) > RECEIPT_COPY_THRESHOLD:
+        return await _copy_merge(db, rows)
+    if dialect == "postgresql":
+        return await _upsert_returning(db, rows)
+    return await _upsert_counted(db, app_id, rows)
+
+
+def _upsert_stmt(insert, rows: List[dict]):
+    stmt = insert(Receipt).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[Receipt.app_id, Receipt.transaction_id],
+        set_={"status": stmt.excluded.status, "expires_at": stmt.excluded.expires_at},
+    )
+
+
+async def _upsert_returning(db: AsyncSession, rows: List[dict]) -> Tuple[int, int]:
+    inserted = 0
+    for i in range(0, len(rows), UPSERT_BATCH_ROWS):
+        # xmax is 0 only for freshly inserted tuples
+        stmt = _upsert_stmt(pg_insert, rows[i:i + UPSERT_BATCH_ROWS]).returning(
+            text("(xmax = 0) AS inserted")
+        )
+        inserted += sum(1 for (was_inserted,) in await db.execute(stmt) if was_inserted)
+    return inserted, len(rows) - inserted
+
+
+async def _copy_merge(db: AsyncSession, rows: List[dict]) -> Tuple[int, int]:
+    # Through the session so it autobegins the transaction first: sent on the
+    # bare asyncpg connection it would autocommit and ON COMMIT DROP at once
+    await db.execute(CREATE_STAGING)
+    conn = await db.connection()
+    raw = await conn.get_raw_connection()
+    asyncpg_conn = raw.driver_connection
+    await asyncpg_conn.copy_records_to_table(
+        "receipts_staging",
+        records=[(r["app_id"], r["transaction_id"], r["status"], r["expires_at"]) for r in rows],
+        columns=["app_id", "transaction_id", "status", "expires_at"],
+    )
+    # Single set-based merge on the same connection/transaction as the COPY
+    result = await db.execute(MERGE_FROM_STAGING)
+    inserted = sum(1 for (was_inserted,) in result if was_inserted)
+    return inserted, len(rows) - inserted
+
+
+async def _upsert_counted(db: AsyncSession, app_id: str, rows: List[dict]) -> Tuple[int, int]:
+    # SQLite stand-in: no xmax, so count pre-existing keys first
+    ids = [r["transaction_id"] for r in rows]
+    existing = 0
+    for i in range(0, len(ids), UPSERT_BATCH_ROWS):
+        chunk = ids[i:i + UPSERT_BATCH_ROWS]
+        existing += len((await db.execute(
+            select(Receipt.id).where(Receipt.app_id == app_id, Receipt.transaction_id.in_(chunk))
+        )).all())
+    for i in range(0, len(rows), UPSERT_BATCH_ROWS):
+        await db.execute(_upsert_stmt(sqlite_insert, rows[i:i + UPSERT_BATCH_ROWS]))
+    return len(rows) - existing, existing
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from .database import engine, read_engine
+
+logger = logging.getLogger(__name__)
+
+# Connections opened before /health reports ready
+WARM_DB_CONNECTIONS = int(os.getenv("WARM_DB_CONNECTIONS", "4"))
+WARM_REDIS_CONNECTIONS = int(os.getenv("WARM_REDIS_CONNECTIONS", "4"))
+WARM_RETRY_SECONDS = float(os.getenv("WARM_RETRY_SECONDS", "2"))
+
+
+class StartupTimer:
+    """Records how long each startup phase took, in seconds."""
+
+    def __init__(self, **initial):
+        self.phases = dict(initial)
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - start
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases.items())
+
+
+async def _warm_engine(eng, connections: int):
+    async def touch():
+        async with eng.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Concurrent checkouts force the pool to open distinct connections
+    await asyncio.gather(*(touch() for _ in range(connections)))
+
+
+async def _warm_redis(client, connections: int):
+    await asyncio.gather(*(client.ping() for _ in range(connections)))
+
+
+async def warm_up(app, redis_client, timer: StartupTimer):
+    """Fill DB and Redis pools, then flip ``app.state.ready``.
+
+    Retries until both succeed so a slow dependency only delays readiness.
+    """
+    while True:
+        try:
+            with timer.phase("warm_db"):
+                await _warm_engine(engine, WARM_DB_CONNECTIONS)
+                if read_engine is not engine:
+                    await _warm_engine(read_engine, WARM_DB_CONNECTIONS)
+            with timer.phase("warm_redis"):
+                await _warm_redis(redis_client, WARM_REDIS_CONNECTIONS)
+            break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[Startup] Warm-up failed, retrying in {WARM_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(WARM_RETRY_SECONDS)
+
+    timer.phases["total"] = time.perf_counter() - timer.started
+    app.state.ready = True
+    logger.info(f"[Startup] Ready: {timer.summary()}")
@@ -0,0 +1,210 @@
+"""Bot task worker.
+
+Consumes the bot task stream through a Redis consumer group, so any number
+of worker processes can run side by side:
+
+    python -m app.worker --concurrency 16 --batch 32
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import time
+
+import redis.asyncio as redis
+
+from .redis_pool import init_redis, close_redis
+from .services.apns import PushDispatcher
+from .services.bot_queue import BOT_STREAM, BOT_GROUP, BOT_DEAD_LETTER_STREAM, ensure_group
+
+logger = logging.getLogger(__name__)
+
+BOT_WORKER_CONCURRENCY = int(os.getenv("BOT_WORKER_CONCURRENCY", "8"))
+BOT_WORKER_BATCH = int(os.getenv("BOT_WORKER_BATCH", "16"))
+# Pending entries idle longer than this (ms) are reclaimed from dead consumers
+BOT_WORKER_CLAIM_IDLE_MS = int(os.getenv("BOT_WORKER_CLAIM_IDLE_MS", "60000"))
+# Deliveries before an entry is moved to the dead-letter stream
+BOT_WORKER_MAX_DELIVERIES = int(os.getenv("BOT_WORKER_MAX_DELIVERIES", "5"))
+BOT_WORKER_STATS_INTERVAL = float(os.getenv("BOT_WORKER_STATS_INTERVAL", "30"))
+
+
+async def handle_email(task: dict):
+    # Delivery integration lives outside this repo; log so the flow is visible
+    logger.info(f"[Worker] email task {task['id']} for {task['app_id']}")
+
+
+async def handle_social(task: dict):
+    logger.info(f"[Worker] social task {task['id']} for {task['app_id']}")
+
+
+# Created in main() so it shares the worker's Redis pool
+push_dispatcher: PushDispatcher = None
+
+
+async def handle_push(task: dict):
+    payload = dict(task["payload"])
+    topic = payload.pop("topic", None)
+    stats = await push_dispatcher.send(task["app_id"], payload, topic)
+    logger.info(f"[Worker] push task {task['id']} for {task['app_id']}: {stats}")
+
+
+HANDLERS = {
+    "email": handle_email,
+    "social": handle_social,
+    "push": handle_push,
+}
+
+
+class BotWorker:
+    def __init__(
+        self,
+        r: redis.Redis,
+        consumer: str = None,
+        concurrency: int = BOT_WORKER_CONCURRENCY,
+        batch: int = BOT_WORKER_BATCH,
+        claim_idle_ms: int = BOT_WORKER_CLAIM_IDLE_MS,
+        max_deliveries: int = BOT_WORKER_MAX_DELIVERIES,
+    ):
+        self.r = r
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch = batch
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self._slots = asyncio.Semaphore(concurrency)
+        self._inflight = set()
+        self._stopping = False
+        self.stats = {"processed": 0, "failed": 0, "reclaimed": 0, "dead_lettered": 0}
+
+    async def run(self):
+        await ensure_group(self.r)
+        reclaimer = asyncio.create_task(self._reclaim_loop())
+        reporter = asyncio.create_task(self._stats_loop())
+        try:
+            while not self._stopping:
+                # Only read as many entries as we have free slots for
+                await self._slots.acquire()
+                self._slots.release()
+                # Block stays below the pool's 2s socket timeout
+                response = await self.r.xreadgroup(
+                    BOT_GROUP, self.consumer, {BOT_STREAM: ">"}, count=self.batch, block=1000
+                )
+                for _, entries in response or []:
+                    for entry_id, fields in entries:
+                        await self._dispatch(entry_id, fields)
+        finally:
+            reclaimer.cancel()
+            reporter.cancel()
+            # Drain what we already pulled; anything unfinished stays pending
+            if self._inflight:
+                await asyncio.wait(self._inflight, timeout=30)
+
+    def stop(self):
+        self._stopping = True
+
+    async def _dispatch(self, entry_id, fields):
+        await self._slots.acquire()
+        task = asyncio.create_task(self._process(entry_id, fields))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, entry_id, fields):
+        try:
+            task = json.loads(fields[b"data"])
+            handler = HANDLERS.get(task.get("type"))
+            if handler is None:
+                raise ValueError(f"Unknown task type {task.get('type')!r}")
+            await handler(task)
+            await self.r.xack(BOT_STREAM, BOT_GROUP, entry_id)
+            self.stats["processed"] += 1
+        except Exception as e:
+            # Left pending; the reclaim loop retries or dead-letters it
+            self.stats["failed"] += 1
+            logger.error(f"[Worker] Task {entry_id!r} failed: {e}")
+        finally:
+            self._slots.release()
+
+    async def _reclaim_loop(self):
+        while True:
+            await asyncio.sleep(self.claim_idle_ms / 1000)
+            try:
+                await self._dead_letter()
+                start = "0-0"
+                while True:
+                    start, entries, *_ = await self.r.xautoclaim(
+                        BOT_STREAM, BOT_GROUP, self.consumer,
+                        min_idle_time=self.claim_idle_ms, start_id=start, count=self.batch
+                    )
+                    for entry_id, fields in entries:
+                        if fields is None:
+                            # Trimmed from the stream before it was acked
+                            await self.r.xack(BOT_STREAM, BOT_GROUP, entry_id)
+                            continue
+                        self.stats["reclaimed"] += 1
+                        await self._dispatch(entry_id, fields)
+                    if start in (b"0-0", "0-0"):
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Worker] Reclaim failed: {e}")
+
+    async def _dead_letter(self):
+        pending = await self.r.xpending_range(
+            BOT_STREAM, BOT_GROUP, min="-", max="+", count=100, idle=self.claim_idle_ms
+        )
+        for entry in pending:
+            if entry["times_delivered"] < self.max_deliveries:
+                continue
+            entry_id = entry["message_id"]
+            for _, fields in await self.r.xrange(BOT_STREAM, entry_id, entry_id):
+                await self.r.xadd(BOT_DEAD_LETTER_STREAM, fields)
+            await self.r.xack(BOT_STREAM, BOT_GROUP, entry_id)
+            self.stats["dead_lettered"] += 1
+
+    async def lag(self) -> dict:
+        for group in await self.r.xinfo_groups(BOT_STREAM):
+            name = group["name"]
+            if name in (BOT_GROUP, BOT_GROUP.encode()):
+                # `lag` (entries not yet delivered) needs Redis 7+
+                return {"pending": group.get("pending"), "lag": group.get("lag")}
+        return {}
+
+    async def _stats_loop(self):
+        last_processed, last_time = 0, time.monotonic()
+        while True:
+            await asyncio.sleep(BOT_WORKER_STATS_INTERVAL)
+            now = time.monotonic()
+            rate = (self.stats["processed"] - last_processed) / (now - last_time)
+            last_processed, last_time = self.stats["processed"], now
+            try:
+                lag = await self.lag()
+            except Exception as e:
+                lag = {"error": str(e)}
+            logger.info(f"[Worker] {self.consumer}: {rate:.1f} tasks/s {self.stats} {lag}")
+
+
+async def main(concurrency: int, batch: int):
+    global push_dispatcher
+    manager = init_redis()
+    push_dispatcher = PushDispatcher(manager.client)
+    worker = BotWorker(manager.client, concurrency=concurrency, batch=batch)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await push_dispatcher.close()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a bot task worker")
+    parser.add_argument("--concurrency", type=int, default=BOT_WORKER_CONCURRENCY)
+    parser.add_argument("--batch", type=int, default=BOT_WORKER_BATCH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.concurrency, args.batch))
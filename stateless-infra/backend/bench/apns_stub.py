@@ -0,0 +1,39 @@
+"""Local stand-in for the APNs HTTP API.
+
+    uvicorn bench.apns_stub:app --port 8444
+    APNS_ENDPOINT=http://127.0.0.1:8444 python -m app.worker
+
+Accepts every push with 200, except tokens starting with "gone", which get
+410 Unregistered so the dispatcher's cleanup path can be exercised.
+Set APNS_STUB_DELAY (seconds) to simulate network latency.
+"""
+import asyncio
+import os
+
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+DELAY = float(os.getenv("APNS_STUB_DELAY", "0"))
+received = {"count": 0}
+
+
+async def push(request):
+    token = request.path_params["token"]
+    await request.body()
+    if DELAY:
+        await asyncio.sleep(DELAY)
+    received["count"] += 1
+    if token.startswith("gone"):
+        return JSONResponse({"reason": "Unregistered"}, status_code=410)
+    return Response(status_code=200)
+
+
+async def stats(request):
+    return JSONResponse(received)
+
+
+app = Starlette(routes=[
+    Route("/3/device/{token}", push, methods=["POST"]),
+    Route("/stats", stats),
+])
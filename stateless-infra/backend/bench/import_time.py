@@ -0,0 +1,60 @@
+"""CI guard on cold-start import cost.
+
+Imports app.main in a fresh interpreter (the same work a new Render
+instance does before it can serve) and fails if it exceeds the budget:
+
+    python -m bench.import_time --budget 1.5
+    python -m bench.import_time --top 15     # also list the slowest modules
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "1.5"))
+
+
+def measure(runs: int):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    best, importtime = None, ""
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=backend, env=env, capture_output=True, text=True, check=True,
+        )
+        seconds = float(proc.stdout.strip().splitlines()[-1])
+        if best is None or seconds < best:
+            best, importtime = seconds, proc.stderr
+    return best, importtime
+
+
+def slowest(importtime: str, top: int):
+    rows = []
+    for line in importtime.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s+(.*)", line)
+        if m:
+            rows.append((int(m.group(2)), m.group(3).strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing app.main is too slow")
+    parser.add_argument("--budget", type=float, default=IMPORT_TIME_BUDGET, help="Seconds")
+    parser.add_argument("--runs", type=int, default=3, help="Best of N fresh interpreters")
+    parser.add_argument("--top", type=int, default=0, help="Show the N slowest modules (cumulative)")
+    args = parser.parse_args()
+
+    seconds, importtime = measure(args.runs)
+    for cumulative_us, module in slowest(importtime, args.top):
+        print(f"{cumulative_us / 1000:>9.1f} ms  {module}")
+    print(f"import app.main: {seconds * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms)")
+    if seconds > args.budget:
+        print("[ERROR] Import time over budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""End-to-end load benchmark for the stateless API.
+
+Starts ``bench.serve`` (aiosqlite + fakeredis by default) unless ``--url``
+points at a running server, drives the hot endpoints with a closed-loop
+client pool and writes per-endpoint RPS and latency percentiles to JSON:
+
+    python -m bench.load --concurrency 64 --duration 30
+    python -m bench.load --db-url postgresql+asyncpg://... --redis-url redis://localhost:6379/0
+    python -m bench.load --compare bench/results/<old-commit>.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+from .stack import DEFAULT_DB_URL
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+DEFAULT_MIX = "drafts=2,bots=1,ios=1,subscriptions=4"
+
+
+def draft_body(rng: random.Random, size: int) -> dict:
+    return {"content": "x" * size, "type": rng.choice(["email", "social", "support"])}
+
+
+def bot_body(rng: random.Random, size: int) -> dict:
+    return {"type": rng.choice(["email", "social"]), "payload": {"text": "x" * min(size, 9000)}}
+
+
+def ios_body(rng: random.Random, size: int) -> dict:
+    return {"token": "%064x" % rng.getrandbits(256)}
+
+
+ENDPOINTS = {
+    "drafts": ("POST", "/drafts", draft_body),
+    "bots": ("POST", "/bots/trigger", bot_body),
+    "ios": ("POST", "/ios/register", ios_body),
+    "subscriptions": ("GET", "/subscriptions", None),
+}
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint {name!r} in --mix; choose from {sorted(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def tenant_weights(tenants: int, skew: float) -> list:
+    # Zipf-like: tenant k gets weight 1/k^skew (skew=0 is uniform)
+    return [1.0 / (k ** skew) for k in range(1, tenants + 1)]
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("Server did not become ready")
+
+
+async def drive(args) -> dict:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    tenants = [f"bench{i}" for i in range(args.tenants)]
+    t_weights = tenant_weights(args.tenants, args.skew)
+
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.0) as client:
+        await wait_ready(client)
+        recording = False
+        stop_at = time.monotonic() + args.warmup + args.duration
+
+        async def user(seed: int):
+            rng = random.Random(seed)
+            while time.monotonic() < stop_at:
+                name = rng.choices(names, weights)[0]
+                method, path, body = ENDPOINTS[name]
+                headers = {"X-App-ID": rng.choices(tenants, t_weights)[0]}
+                json_body = body(rng, args.payload_bytes) if body else None
+                start = time.perf_counter()
+                try:
+                    resp = await client.request(method, path, headers=headers, json=json_body)
+                    status = resp.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                elapsed = time.perf_counter() - start
+                if recording:
+                    latencies[name].append(elapsed)
+                    statuses[name][status] += 1
+
+        users = [asyncio.create_task(user(args.seed + i)) for i in range(args.concurrency)]
+        await asyncio.sleep(args.warmup)
+        recording = True
+        started = time.monotonic()
+        await asyncio.gather(*users)
+        measured = time.monotonic() - started
+
+    results = {}
+    for name in names:
+        values = sorted(latencies[name])
+        ok = sum(n for s, n in statuses[name].items() if isinstance(s, int) and s < 400)
+        results[name] = {
+            "requests": len(values),
+            "errors": len(values) - ok,
+            "statuses": {str(s): n for s, n in statuses[name].items()},
+            "rps": len(values) / measured if measured else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    total = sum(r["requests"] for r in results.values())
+    results["_total"] = {"requests": total, "rps": total / measured if measured else 0.0}
+    return results
+
+
+def print_table(results: dict, baseline: dict = None):
+    print(f"{'endpoint':<15}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, r in results.items():
+        if name.startswith("_"):
+            continue
+        line = f"{name:<15}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['errors']:>8}"
+        old = (baseline or {}).get(name)
+        if old and old["rps"]:
+            line += f"   rps {100 * (r['rps'] / old['rps'] - 1):+.1f}%"
+            if old["p99_ms"]:
+                line += f"  p99 {100 * (r['p99_ms'] / old['p99_ms'] - 1):+.1f}%"
+        print(line)
+    print(f"{'total':<15}{results['_total']['rps']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the stateless API")
+    parser.add_argument("--url", help="Target a running server instead of starting bench.serve")
+    parser.add_argument("--db-url", default=DEFAULT_DB_URL)
+    parser.add_argument("--redis-url", default="fake", help="'fake' for fakeredis or a redis:// URL")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds before recording")
+    parser.add_argument("--tenants", type=int, default=100)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for tenant selection (0 = uniform)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Endpoint weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--payload-bytes", type=int, default=512)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="Result file (default: bench/results/<commit>.json)")
+    parser.add_argument("--compare", help="Previous result file to diff against")
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        port = free_port()
+        args.url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "bench.serve", "--port", str(port),
+             "--db-url", args.db_url, "--redis-url", args.redis_url],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+    try:
+        results = asyncio.run(drive(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_table(results, baseline)
+    print(f"[OK] Results written to {out}")
+
+
+if __name__ == "__main__":
+    main()
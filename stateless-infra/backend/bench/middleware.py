@@ -0,0 +1,134 @@
+"""Per-request overhead of the tenant middleware.
+
+Compares the old ``@app.middleware("http")`` function (BaseHTTPMiddleware)
+with ``app.middleware.TenantContextMiddleware`` by calling a minimal
+Starlette app directly over ASGI, so no network or server is involved:
+
+    python -m bench.middleware --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from app.middleware import TenantContextMiddleware
+
+
+class AllowAll:
+    async def allow(self, key: str) -> bool:
+        return True
+
+
+class DenyAll:
+    async def allow(self, key: str) -> bool:
+        return False
+
+
+async def legacy_tenant_context(request: Request, call_next):
+    # Copy of the former add_tenant_context in app/main.py
+    app_id = request.headers.get("X-App-ID")
+    if request.url.path in ["/", "/docs", "/openapi.json", "/health"] or request.url.path.startswith("/health/"):
+        return await call_next(request)
+    if not app_id:
+        return JSONResponse(status_code=400, content={"detail": "Missing X-App-ID header"})
+    if len(app_id) > 64 or not app_id.isalnum():
+        return JSONResponse(status_code=400, content={"detail": "Invalid X-App-ID format"})
+    request.state.app_id = app_id
+    if not await request.app.state.rate_limiter.allow(app_id):
+        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"})
+    return await call_next(request)
+
+
+async def ok(request):
+    return PlainTextResponse("ok")
+
+
+def build_app(kind: str, limiter) -> Starlette:
+    app = Starlette(routes=[Route("/drafts", ok, methods=["GET"])])
+    app.state.rate_limiter = limiter
+    if kind == "legacy":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_tenant_context)
+    elif kind == "asgi":
+        app.add_middleware(TenantContextMiddleware)
+    return app
+
+
+class Connection:
+    """receive/send for one request, shaped like a real server's.
+
+    The (empty) body is delivered once; later receive() calls wait until the
+    response is complete and then report ``http.disconnect``, which is what
+    BaseHTTPMiddleware's disconnect listener expects.
+    """
+
+    def __init__(self):
+        self.body_sent = False
+        self.response_done = asyncio.Event()
+
+    async def receive(self):
+        if not self.body_sent:
+            self.body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await self.response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(self, message):
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            self.response_done.set()
+
+
+async def run(app, requests: int, path: str = "/drafts") -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"x-app-id", b"bench1")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def request():
+        conn = Connection()
+        await app(dict(scope), conn.receive, conn.send)
+
+    # Warm up routing and middleware stack construction
+    for _ in range(200):
+        await request()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request()
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tenant middleware microbenchmark")
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    cases = [
+        ("no middleware", build_app("none", AllowAll())),
+        ("legacy allowed", build_app("legacy", AllowAll())),
+        ("asgi allowed", build_app("asgi", AllowAll())),
+        ("legacy 429", build_app("legacy", DenyAll())),
+        ("asgi 429", build_app("asgi", DenyAll())),
+    ]
+    timings = {name: asyncio.run(run(app, args.requests)) for name, app in cases}
+    base = timings["no middleware"]
+    for name, per_request in timings.items():
+        print(f"{name:<16}{per_request * 1e6:>9.1f} us/req   overhead {(per_request - base) * 1e6:>7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
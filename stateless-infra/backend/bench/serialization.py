@@ -0,0 +1,76 @@
+"""Response serialization cost: FastAPI's default path vs app.fastjson.
+
+Both apps return identical payloads; the standard one goes through
+response_model validation and jsonable_encoder, the fast one returns a
+prebuilt orjson response. Called over direct ASGI (see bench.middleware):
+
+    python -m bench.serialization --requests 5000 --receipts 20
+"""
+import argparse
+import asyncio
+import datetime
+
+from fastapi import FastAPI
+
+from app import schemas
+from app.fastjson import FastJSONResponse
+from .middleware import run
+
+
+def payloads(receipts: int):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    draft = {
+        "id": 1,
+        "app_id": "bench1",
+        "content": "x" * 512,
+        "type": "email",
+        "created_at": now,
+        "expires_at": now + datetime.timedelta(days=1),
+    }
+    subscription = {
+        "active": True,
+        "receipts": [
+            {"id": i, "app_id": "bench1", "transaction_id": f"tx{i}", "status": "active", "expires_at": now}
+            for i in range(receipts)
+        ],
+    }
+    page = {"items": [dict(draft, id=i) for i in range(50)], "next_cursor": None}
+    return draft, subscription, page
+
+
+def build_app(fast: bool, receipts: int) -> FastAPI:
+    draft, subscription, page = payloads(receipts)
+    wrap = FastJSONResponse if fast else (lambda content: content)
+    app = FastAPI()
+
+    @app.get("/draft", response_model=schemas.DraftResponse)
+    async def get_draft():
+        return wrap(draft)
+
+    @app.get("/subscriptions")
+    async def get_subscriptions():
+        return wrap(subscription)
+
+    @app.get("/page", response_model=schemas.DraftPage)
+    async def get_page():
+        return wrap(page)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialization microbenchmark")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--receipts", type=int, default=20, help="Receipts per /subscriptions payload")
+    args = parser.parse_args()
+
+    standard, fast = build_app(False, args.receipts), build_app(True, args.receipts)
+    print(f"{'endpoint':<16}{'standard us':>13}{'fast us':>10}{'speedup':>9}")
+    for path in ("/draft", "/subscriptions", "/page"):
+        slow_t = asyncio.run(run(standard, args.requests, path))
+        fast_t = asyncio.run(run(fast, args.requests, path))
+        print(f"{path:<16}{slow_t * 1e6:>13.1f}{fast_t * 1e6:>10.1f}{slow_t / fast_t:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
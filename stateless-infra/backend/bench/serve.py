@@ -0,0 +1,30 @@
+"""Run app.main:app on local stand-ins (used by bench.load)."""
+import argparse
+
+import uvicorn
+
+from .stack import configure, DEFAULT_DB_URL
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API against local stand-ins")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db-url", default=DEFAULT_DB_URL)
+    parser.add_argument("--redis-url", default="fake", help="'fake' for fakeredis or a redis:// URL")
+    args = parser.parse_args()
+
+    configure(db_url=args.db_url, redis_url=args.redis_url)
+
+    # Same schema path as production: Alembic, not create_all
+    from alembic import command
+    from alembic.config import Config
+    command.upgrade(Config("alembic.ini"), "head")
+
+    from app.main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Local stand-ins for running app.main:app under benchmark.
+
+Must be applied before ``app`` is imported: database and encryption
+settings are read from the environment at import time.
+"""
+import os
+
+DEFAULT_DB_URL = "sqlite+aiosqlite:///./bench.db"
+
+
+def configure(db_url: str = DEFAULT_DB_URL, redis_url: str = "fake", rate_limit: int = 1_000_000):
+    os.environ["DATABASE_URL"] = db_url
+    os.environ.setdefault("DB_PROFILE", "bench")
+    # Rate limiting is part of what we measure, rejections are not
+    os.environ["RATE_LIMIT_PER_MINUTE"] = str(rate_limit)
+    if not os.getenv("ENCRYPTION_KEY"):
+        from cryptography.fernet import Fernet
+        os.environ["ENCRYPTION_KEY"] = Fernet.generate_key().decode()
+
+    if redis_url == "fake":
+        use_fakeredis()
+    else:
+        os.environ["REDIS_URL"] = redis_url
+
+
+def use_fakeredis():
+    import fakeredis
+    from app import redis_pool
+
+    class FakeRedisManager(redis_pool.RedisManager):
+        # In-process Redis; Lua (rate limiter script) needs fakeredis[lua]
+        def __init__(self, **kwargs):
+            self.url = "fakeredis://"
+            self.max_connections = 0
+            self.pool = None
+            self.client = fakeredis.FakeAsyncRedis()
+
+        def stats(self) -> dict:
+            return {"fake": True}
+
+        async def close(self):
+            await self.client.close()
+
+    redis_pool.RedisManager = FakeRedisManager
@@ -0,0 +1,59 @@
+"""Baseline schema (tables as previously created by create_all at boot)
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+
+Databases that were bootstrapped by the old create_all call already have
+these tables: run `alembic stamp 0001_baseline` once, then upgrade.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "drafts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("app_id", sa.String()),
+        sa.Column("type", sa.String()),
+        sa.Column("content", sa.Text()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("expires_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_drafts_id", "drafts", ["id"])
+    op.create_index("ix_drafts_app_id", "drafts", ["app_id"])
+
+    op.create_table(
+        "metrics",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("app_id", sa.String()),
+        sa.Column("metric_type", sa.String()),
+        sa.Column("count", sa.Integer()),
+        sa.Column("period", sa.String()),
+    )
+    op.create_index("ix_metrics_id", "metrics", ["id"])
+    op.create_index("ix_metrics_app_id", "metrics", ["app_id"])
+
+    op.create_table(
+        "receipts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("app_id", sa.String()),
+        sa.Column("transaction_id", sa.String()),
+        sa.Column("status", sa.String()),
+        sa.Column("expires_at", sa.DateTime(timezone=True)),
+    )
+    op.create_index("ix_receipts_id", "receipts", ["id"])
+    op.create_index("ix_receipts_app_id", "receipts", ["app_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("receipts")
+    op.drop_table("metrics")
+    op.drop_table("drafts")
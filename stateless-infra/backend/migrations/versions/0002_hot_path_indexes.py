@@ -0,0 +1,37 @@
+"""Indexes and constraints for cleanup, entitlements and metric upserts
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+
+The metrics unique constraint fails if duplicate (app_id, metric_type,
+period) rows already exist; merge them before upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_hot_path_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_drafts_expires_at", "drafts", ["expires_at"])
+    op.create_index(
+        "ix_receipts_active_app_expires",
+        "receipts",
+        ["app_id", "expires_at"],
+        postgresql_where=sa.text("status = 'active'"),
+        sqlite_where=sa.text("status = 'active'"),
+    )
+    with op.batch_alter_table("metrics") as batch:
+        batch.create_unique_constraint("uq_metrics_app_type_period", ["app_id", "metric_type", "period"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("metrics") as batch:
+        batch.drop_constraint("uq_metrics_app_type_period", type_="unique")
+    op.drop_index("ix_receipts_active_app_expires", table_name="receipts")
+    op.drop_index("ix_drafts_expires_at", table_name="drafts")
@@ -0,0 +1,22 @@
+"""Keyset index for GET /drafts
+
+Revision ID: 0003_draft_listing_index
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = "0003_draft_listing_index"
+down_revision = "0002_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_drafts_app_created_id", "drafts", ["app_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_drafts_app_created_id", table_name="drafts")
@@ -0,0 +1,25 @@
+"""Unique (app_id, transaction_id) on receipts for bulk upserts
+
+Revision ID: 0004_receipt_unique_transaction
+Revises: 0003_draft_listing_index
+Create Date: 2026-10-17
+
+Fails if duplicate receipts already exist for a tenant; remove them first.
+"""
+from alembic import op
+
+
+revision = "0004_receipt_unique_transaction"
+down_revision = "0003_draft_listing_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("receipts") as batch:
+        batch.create_unique_constraint("uq_receipts_app_transaction", ["app_id", "transaction_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("receipts") as batch:
+        batch.drop_constraint("uq_receipts_app_transaction", type_="unique")
@@ -0,0 +1,43 @@
+"""Weekly and monthly metric rollup tables
+
+Revision ID: 0005_metric_rollups
+Revises: 0004_receipt_unique_transaction
+Create Date: 2026-10-17
+
+Rollups start empty; the first compaction run after deploy fills the
+lookback window. Run `python -m app.services.metric_rollups --full` once to
+backfill older history.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_metric_rollups"
+down_revision = "0004_receipt_unique_transaction"
+branch_labels = None
+depends_on = None
+
+ROLLUP_TABLES = (
+    ("metric_rollups_weekly", "uq_metric_rollups_weekly_key"),
+    ("metric_rollups_monthly", "uq_metric_rollups_monthly_key"),
+)
+
+
+def upgrade() -> None:
+    op.create_index("ix_metrics_period", "metrics", ["period"])
+    for table, constraint in ROLLUP_TABLES:
+        op.create_table(
+            table,
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("app_id", sa.String(), nullable=False),
+            sa.Column("metric_type", sa.String(), nullable=False),
+            sa.Column("period_start", sa.Date(), nullable=False),
+            sa.Column("count", sa.BigInteger(), nullable=True),
+            sa.UniqueConstraint("app_id", "metric_type", "period_start", name=constraint),
+        )
+
+
+def downgrade() -> None:
+    for table, _ in reversed(ROLLUP_TABLES):
+        op.drop_table(table)
+    op.drop_index("ix_metrics_period", table_name="metrics")
@@ -0,0 +1,36 @@
+"""Rollup coverage watermark and dirty days
+
+Revision ID: 0006_metric_rollup_state
+Revises: 0005_metric_rollups
+Create Date: 2026-10-17
+
+Until the first compaction after deploy writes a watermark, GET
+/metrics/series reads every bucket from daily rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_metric_rollup_state"
+down_revision = "0005_metric_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "metric_rollup_state",
+        sa.Column("granularity", sa.String(), primary_key=True),
+        sa.Column("covered_from", sa.Date(), nullable=False),
+        sa.Column("covered_through", sa.Date(), nullable=False),
+    )
+    op.create_table(
+        "metric_rollup_dirty",
+        sa.Column("period", sa.String(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("metric_rollup_dirty")
+    op.drop_table("metric_rollup_state")
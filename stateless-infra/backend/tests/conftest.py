@@ -0,0 +1,60 @@
+"""Service-level tests against a real database.
+
+    pip install -r requirements.txt -r tests/requirements.txt
+    python -m pytest tests
+
+Every test runs on a fresh SQLite file. Set TEST_DATABASE_URL to a scratch
+Postgres database to run the Postgres paths too; its schema is dropped and
+migrated from scratch for each test.
+"""
+import contextlib
+import os
+
+import pytest
+from cryptography.fernet import Fernet
+
+# Read at import time by app modules, as in bench/stack.py
+os.environ.setdefault("ENCRYPTION_KEY", Fernet.generate_key().decode())
+
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import build_engine, normalize_url  # noqa: E402
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def db_url(request, tmp_path):
+    if request.param == "sqlite":
+        return f"sqlite+aiosqlite:///{tmp_path / 'test.db'}"
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    return normalize_url(TEST_DATABASE_URL)
+
+
+@pytest.fixture
+def session_factory(db_url):
+    """Migrated database; yields an async context manager opening a session on it.
+
+    Engines are created inside the test's own event loop, so call it from
+    within ``asyncio.run``.
+    """
+    # Same schema path as production: Alembic, not create_all
+    config = Config("alembic.ini")
+    config.set_main_option("sqlalchemy.url", db_url)
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
+
+    @contextlib.asynccontextmanager
+    async def open_session():
+        engine = build_engine(db_url, "bench")
+        try:
+            async with sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as db:
+                yield db
+        finally:
+            await engine.dispose()
+
+    return open_session
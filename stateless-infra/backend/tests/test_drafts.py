@@ -0,0 +1,46 @@
+import asyncio
+import datetime
+
+from sqlalchemy import insert
+
+from app.models import Draft
+from app.services import drafts
+from app.services.encryption import encryption_service
+
+
+def test_pages_do_not_repeat_rows_with_equal_created_at(session_factory):
+    async def scenario():
+        async with session_factory() as db:
+            contents = await encryption_service.encrypt_many([f"draft {i}" for i in range(8)])
+            # One statement, so all five share the server-default created_at
+            await db.execute(insert(Draft.__table__).values([
+                {"app_id": "app1", "type": "email", "content": c} for c in contents[:5]
+            ]))
+            # Older pair with an explicit timestamp: ties in the other stored format
+            older = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1)
+            await db.execute(insert(Draft.__table__).values([
+                {"app_id": "app1", "type": "email", "content": c, "created_at": older}
+                for c in contents[5:7]
+            ]))
+            # Other tenants never show up
+            await db.execute(insert(Draft.__table__).values(
+                app_id="app2", type="email", content=contents[7]
+            ))
+            await db.commit()
+
+            pages, cursor = [], None
+            # Bounded, so a cursor that repeats rows fails instead of looping
+            for _ in range(10):
+                # Through the opaque string, as GET /drafts does
+                after = drafts.decode_cursor(cursor) if cursor else None
+                items, cursor = await drafts.fetch_page(db, "app1", 2, after=after)
+                pages.append([item["id"] for item in items])
+                if cursor is None:
+                    break
+            return pages, items
+
+    pages, last_items = asyncio.run(scenario())
+    ids = [draft_id for page in pages for draft_id in page]
+    assert ids == [5, 4, 3, 2, 1, 7, 6]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+    assert last_items[0]["content"] == "draft 5"
@@ -0,0 +1,68 @@
+import asyncio
+import datetime
+
+import fakeredis
+
+from app.services.entitlements import EntitlementCache, run_invalidation_listener
+
+
+def test_invalidate_fences_a_load_in_flight():
+    async def scenario():
+        cache = EntitlementCache(ttl=60)
+        receipt = {
+            "id": 1,
+            "expires_at": datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1),
+        }
+        release = asyncio.Event()
+        loads = []
+
+        async def loader():
+            loads.append(len(loads))
+            if len(loads) == 1:
+                await release.wait()
+            return [] if len(loads) == 1 else [receipt]
+
+        stale = asyncio.create_task(cache.get("app1", loader))
+        await asyncio.sleep(0)
+        # A receipt write lands while the first load is still reading
+        cache.invalidate(["app1"])
+        release.set()
+        assert await stale == []
+        # The stale answer was not cached: this is a fresh load
+        assert await cache.get("app1", loader) == [receipt]
+        assert await cache.get("app1", loader) == [receipt]
+        return loads, cache
+
+    loads, cache = asyncio.run(scenario())
+    assert loads == [0, 1]
+    assert cache._generations == {}
+
+
+
+def test_invalidation_reaches_other_workers():
+    async def eventually(condition):
+        for _ in range(100):
+            if condition():
+                return True
+            await asyncio.sleep(0.01)
+        return False
+
+    async def loader():
+        return []
+
+    async def scenario():
+        r = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+        writer, reader = EntitlementCache(ttl=60), EntitlementCache(ttl=60)
+        # The listener clears its cache once subscribed; wait for that first
+        await reader.get("app1", loader)
+        listener = asyncio.create_task(run_invalidation_listener(reader, r))
+        assert await eventually(lambda: "app1" not in reader._entries)
+
+        await reader.get("app1", loader)
+        assert "app1" in reader._entries
+        await writer.invalidate_everywhere(r, ["app1"])
+        dropped = await eventually(lambda: "app1" not in reader._entries)
+        listener.cancel()
+        return dropped
+
+    assert asyncio.run(scenario())
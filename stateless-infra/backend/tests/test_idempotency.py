@@ -0,0 +1,71 @@
+import asyncio
+
+import fakeredis
+import pytest
+import redis.asyncio as redis
+from fastapi import HTTPException
+
+from app.services.idempotency import IdempotencyStore
+
+
+def test_replay_is_sealed_in_redis():
+    async def scenario():
+        r = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+        store = IdempotencyStore()
+        calls = []
+
+        async def create():
+            calls.append(1)
+            return {"id": 1, "content": "secret draft"}
+
+        first = await store.run(r, "app1", "drafts", "k1", {"content": "secret draft"}, create)
+        # Another process: nothing in flight locally, so it reads Redis
+        second = await IdempotencyStore().run(r, "app1", "drafts", "k1", {"content": "secret draft"}, create)
+        return first, second, calls, await r.get("idem:app1:drafts:k1")
+
+    first, second, calls, stored = asyncio.run(scenario())
+    assert first == ({"id": 1, "content": "secret draft"}, False)
+    assert second == ({"id": 1, "content": "secret draft"}, True)
+    assert calls == [1]
+    assert b"secret" not in stored
+
+
+def test_same_process_duplicate_times_out():
+    async def scenario():
+        r = fakeredis.FakeAsyncRedis(server=fakeredis.FakeServer())
+        store = IdempotencyStore(wait=0.05)
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return {"ok": True}
+
+        original = asyncio.create_task(store.run(r, "app1", "drafts", "k1", {}, slow))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as duplicate:
+            await store.run(r, "app1", "drafts", "k1", {}, slow)
+        release.set()
+        return duplicate.value.status_code, await original
+
+    status, original = asyncio.run(scenario())
+    assert status == 409
+    assert original == ({"ok": True}, False)
+
+
+def test_redis_failure_while_polling_is_503():
+    class FlakyRedis(fakeredis.FakeAsyncRedis):
+        async def get(self, *args, **kwargs):
+            raise redis.ConnectionError("down")
+
+    async def scenario():
+        r = FlakyRedis(server=fakeredis.FakeServer())
+        await r.set("idem:app1:drafts:k1", '{"state": "pending"}')
+
+        async def create():
+            return {}
+
+        with pytest.raises(HTTPException) as duplicate:
+            await IdempotencyStore().run(r, "app1", "drafts", "k1", {}, create)
+        return duplicate.value.status_code
+
+    assert asyncio.run(scenario()) == 503
@@ -0,0 +1,80 @@
+import asyncio
+
+from app.services.metric_ingest import MetricAggregator
+
+
+def test_stop_during_a_periodic_flush_keeps_its_increments():
+    async def scenario():
+        aggregator = MetricAggregator(flush_interval=0.01)
+        saved, writing = {}, asyncio.Event()
+
+        async def upsert(pending):
+            if not writing.is_set():
+                # The first write hangs until the deploy cancels it
+                writing.set()
+                await asyncio.Event().wait()
+            for key, count in pending.items():
+                saved[key] = saved.get(key, 0) + count
+
+        aggregator._upsert = upsert
+        for _ in range(5):
+            await aggregator.add("app1", "view", "2024-01-01")
+        aggregator.start()
+        await writing.wait()
+        await aggregator.stop()
+        return saved
+
+    assert asyncio.run(scenario()) == {("app1", "view", "2024-01-01"): 5}
+
+
+def test_a_burst_over_the_threshold_starts_one_early_flush():
+    async def scenario():
+        aggregator = MetricAggregator(flush_threshold=10)
+        flush, flushes, saved = aggregator.flush, [], []
+
+        async def counted_flush():
+            flushes.append(1)
+            return await flush()
+
+        async def upsert(pending):
+            saved.append(len(pending))
+
+        aggregator.flush, aggregator._upsert = counted_flush, upsert
+        for i in range(1000):
+            await aggregator.add("app1", "view", f"day-{i}")
+        await aggregator.stop()
+        return len(flushes), sum(saved)
+
+    flushes, saved = asyncio.run(scenario())
+    # The early flush plus the final one from stop()
+    assert flushes == 2
+    assert saved == 1000
+
+
+def test_full_buffer_sheds_new_keys_while_flushes_fail():
+    async def scenario():
+        aggregator = MetricAggregator(max_keys=3)
+        calls = []
+
+        async def upsert(pending):
+            calls.append(len(pending))
+            raise ConnectionError("database down")
+
+        aggregator._upsert = upsert
+        for i in range(3):
+            await aggregator.add("app1", "view", f"day-{i}")
+        for i in range(3, 13):
+            await aggregator.add("app1", "view", f"day-{i}")
+        # Keys already buffered still count
+        await aggregator.add("app1", "view", "day-0", 4)
+        return calls, aggregator.stats["dropped"], dict(aggregator._buffer)
+
+    calls, dropped, buffer = asyncio.run(scenario())
+    # One failed write, not one per incoming event
+    assert calls == [3]
+    assert dropped == 10
+    assert buffer == {
+        ("app1", "view", "day-0"): 5,
+        ("app1", "view", "day-1"): 1,
+        ("app1", "view", "day-2"): 1,
+    }
@@ -0,0 +1,80 @@
+import asyncio
+import datetime
+
+from sqlalchemy import insert, select
+
+from app.models import Metric, MetricMonthly, MetricRollupDirty
+from app.services import metric_ingest, metric_rollups
+from app.services.metric_ingest import MetricAggregator
+from app.services.metric_rollups import compact, query_series
+
+
+def test_series_stays_exact_outside_the_compaction_window(session_factory, monkeypatch):
+    monkeypatch.setattr(metric_rollups, "AsyncSessionLocal", session_factory)
+    monkeypatch.setattr(metric_ingest, "AsyncSessionLocal", session_factory)
+    today = metric_rollups.utc_today()
+    # One view a day for a year, so every month of it has settled
+    days = [today - datetime.timedelta(days=n) for n in range(1, 366)]
+    start, end = days[-1].replace(day=1), today
+    expected = {}
+    for d in days:
+        expected[d.replace(day=1)] = expected.get(d.replace(day=1), 0) + 1
+
+    async def series():
+        async with session_factory() as db:
+            result = await query_series(db, "app1", "view", start, end, "month")
+        return {p["period"]: p["count"] for p in result["points"] if p["count"]}, result["rows_read"]
+
+    async def scenario():
+        async with session_factory() as db:
+            await db.execute(insert(Metric), [
+                {"app_id": "app1", "metric_type": "view", "period": d.isoformat(), "count": 1} for d in days
+            ])
+            await db.commit()
+        window = today - datetime.timedelta(days=metric_rollups.METRIC_ROLLUP_LOOKBACK_DAYS)
+        results = {}
+
+        # The periodic loop only compacts its lookback window
+        await compact(window)
+        results["windowed"] = await series()
+
+        # Full backfill extends the watermark over the whole year
+        await compact()
+        results["backfilled"] = await series()
+
+        # A late event for a day far outside the window, in a settled month
+        aggregator = MetricAggregator()
+        await aggregator.add("app1", "view", days[200].isoformat(), 5)
+        await aggregator.flush()
+        results["late"] = await series()
+
+        # The next periodic run recomputes that month and clears the mark
+        await compact(window)
+        async with session_factory() as db:
+            results["dirty"] = (await db.scalars(select(MetricRollupDirty.period))).all()
+            results["old_month"] = await db.scalar(select(MetricMonthly.count).where(
+                MetricMonthly.app_id == "app1", MetricMonthly.period_start == days[200].replace(day=1)
+            ))
+        results["recompacted"] = await series()
+        return results
+
+    results = asyncio.run(scenario())
+
+    # Months older than the window come from daily rows, not zero-filled rollups
+    assert results["windowed"][0] == expected
+    assert results["windowed"][1]["daily"] > 300
+
+    assert results["backfilled"][0] == expected
+    # Only the unsettled current/edge months are still read day by day
+    assert results["backfilled"][1]["rollup"] >= 10
+    assert results["backfilled"][1]["daily"] <= 62
+
+    old_month = days[200].replace(day=1)
+    expected[old_month] += 5
+    assert results["late"][0] == expected
+    # The dirty month is read from daily rows until recompacted
+    assert results["late"][1]["rollup"] == results["backfilled"][1]["rollup"] - 1
+
+    assert results["dirty"] == []
+    assert results["old_month"] == expected[old_month]
+    assert results["recompacted"] == (expected, results["backfilled"][1])
@@ -0,0 +1,36 @@
+import asyncio
+import datetime
+
+from sqlalchemy import func, select
+
+from app.models import Receipt
+from app.services.receipts import RECEIPT_COPY_THRESHOLD, upsert_receipts
+
+
+def test_bulk_upsert_above_copy_threshold(session_factory):
+    # Large enough to take the COPY + merge path on Postgres
+    count = RECEIPT_COPY_THRESHOLD + 1000
+    expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=30)
+
+    def payload(status):
+        return [
+            {"transaction_id": f"tx-{i}", "status": status, "expires_at": expires_at}
+            for i in range(count)
+        ]
+
+    async def scenario():
+        async with session_factory() as db:
+            first = await upsert_receipts(db, "app1", payload("active"))
+            await db.commit()
+            # Same transactions again: all updates, no new rows
+            second = await upsert_receipts(db, "app1", payload("expired"))
+            await db.commit()
+            statuses = dict((await db.execute(
+                select(Receipt.status, func.count()).where(Receipt.app_id == "app1").group_by(Receipt.status)
+            )).all())
+            return first, second, statuses
+
+    first, second, statuses = asyncio.run(scenario())
+    assert first == (count, 0)
+    assert second == (0, count)
+    assert statuses == {"expired": count}